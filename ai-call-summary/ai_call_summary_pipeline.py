@@ -1,28 +1,55 @@
 import os
 import argparse
-import librosa
+import subprocess
 import numpy as np
-import torch
+import soundfile as sf
+import soxr
 import pandas as pd
+import ctranslate2
+import onnxruntime as ort
+from ctranslate2.models import Whisper as CT2Whisper
+from onnxruntime.quantization import quantize_dynamic, QuantType
 from pathlib import Path
 from transformers import (
-    WhisperProcessor, WhisperForConditionalGeneration,
-    Wav2Vec2ForCTC, Wav2Vec2Processor,
-    PegasusTokenizer, PegasusForConditionalGeneration,
-    T5Tokenizer, T5ForConditionalGeneration,
+    WhisperProcessor, Wav2Vec2Processor,
+    PegasusTokenizer, T5Tokenizer,
     pipeline
 )
 from rouge_score import rouge_scorer
-from nltk.translate.bleu_score import sentence_bleu
+from sacrebleu.metrics import BLEU
 import sounddevice as sd
-import scipy.io.wavfile as wav
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # ============ CONFIG ============
 SAMPLE_RATE = 16000
 RECORD_SECONDS = 30
+SUMMARY_MIN_TOKENS = 25
+SUMMARY_MAX_NEW_TOKENS = 80
+CHUNK_SECONDS = 30          # Whisper's native window
+WAV2VEC_FRAME_STRIDE = 320  # input samples per Wav2Vec2 logit frame
 os.makedirs("outputs", exist_ok=True)
 
+WHISPER_ID = "openai/whisper-small"
+WAV2VEC_ID = "facebook/wav2vec2-large-960h-lv60"
+PEGASUS_ID = "google/pegasus-cnn_dailymail"
+T5_ID = "t5-base"
+WHISPER_CT2_DIR = Path("models/whisper-small-int8")
+WAV2VEC_ONNX_DIR = Path("models/wav2vec2-large-960h-lv60-onnx")
+WAV2VEC_ONNX_INT8 = WAV2VEC_ONNX_DIR / "model_int8.onnx"
+PEGASUS_CT2_DIR = Path("models/pegasus-cnn_dailymail-int8")
+T5_CT2_DIR = Path("models/t5-base-int8")
+WHISPER_PROMPT = ["<|startoftranscript|>", "<|en|>", "<|transcribe|>", "<|notimestamps|>"]
+
+# Summarizers use the GPU when CTranslate2 sees one, else int8 on CPU
+SUMMARY_DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+SUMMARY_COMPUTE_TYPE = "int8_float16" if SUMMARY_DEVICE == "cuda" else "int8"
+
+# Metric objects are built once; RougeScorer setup loads the stemmer tables
+_ROUGE = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
+_BLEU = BLEU(effective_order=True)
+
 # ============ HELPER FUNCTIONS ============
 def record_audio(duration=RECORD_SECONDS, sr=SAMPLE_RATE):
     print(f"\n🎙️ Recording for {duration} seconds ...")
@@ -31,59 +58,148 @@ def record_audio(duration=RECORD_SECONDS, sr=SAMPLE_RATE):
     print("✅ Recording complete!\n")
     return audio.flatten()
 
+def load_audio(path, sr=SAMPLE_RATE):
+    audio, file_sr = sf.read(path, dtype="float32", always_2d=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if file_sr != sr:
+        audio = soxr.resample(audio, file_sr, sr)
+    return audio
+
 def save_audio(audio, path, sr=SAMPLE_RATE):
-    wav.write(path, sr, (audio * 32767).astype(np.int16))
+    # libsndfile converts float32 -> PCM16 in C, no temporary arrays
+    sf.write(path, audio, sr, subtype="PCM_16")
+
+def ct2_convert(model_id, out_dir):
+    """One-time HF -> CTranslate2 int8 conversion (skipped once converted)."""
+    if (out_dir / "model.bin").exists():
+        return
+    print(f"⏳ Converting {model_id} to CTranslate2 int8 (one-time)...")
+    subprocess.run([
+        "ct2-transformers-converter", "--model", model_id,
+        "--output_dir", str(out_dir), "--quantization", "int8",
+    ], check=True)
+
+def convert_asr_models():
+    """One-time export: Whisper -> CTranslate2 int8, Wav2Vec2 -> ONNX int8."""
+    ct2_convert(WHISPER_ID, WHISPER_CT2_DIR)
+
+    if not WAV2VEC_ONNX_INT8.exists():
+        print("⏳ Exporting Wav2Vec2 to ONNX int8 (one-time)...")
+        subprocess.run([
+            "optimum-cli", "export", "onnx", "--model", WAV2VEC_ID,
+            "--task", "automatic-speech-recognition", str(WAV2VEC_ONNX_DIR),
+        ], check=True)
+        quantize_dynamic(
+            str(WAV2VEC_ONNX_DIR / "model.onnx"), str(WAV2VEC_ONNX_INT8),
+            weight_type=QuantType.QInt8,
+        )
 
 def load_model_asr():
     print("⏳ Loading ASR models...")
-    whisper_processor = WhisperProcessor.from_pretrained("openai/whisper-small")
-    whisper_model = WhisperForConditionalGeneration.from_pretrained("openai/whisper-small")
+    convert_asr_models()
 
-    wav2vec_processor = Wav2Vec2Processor.from_pretrained("facebook/wav2vec2-large-960h-lv60")
-    wav2vec_model = Wav2Vec2ForCTC.from_pretrained("facebook/wav2vec2-large-960h-lv60")
+    # Processors are only used for feature extraction / decoding
+    whisper_processor = WhisperProcessor.from_pretrained(WHISPER_ID)
+    # Both ASR models run concurrently, so each gets half the cores
+    asr_threads = max(1, (os.cpu_count() or 2) // 2)
+    whisper_model = CT2Whisper(
+        str(WHISPER_CT2_DIR), device="cpu", compute_type="int8", intra_threads=asr_threads
+    )
+
+    wav2vec_processor = Wav2Vec2Processor.from_pretrained(WAV2VEC_ID)
+    sess_opts = ort.SessionOptions()
+    sess_opts.intra_op_num_threads = asr_threads
+    wav2vec_model = ort.InferenceSession(
+        str(WAV2VEC_ONNX_INT8), sess_opts, providers=["CPUExecutionProvider"]
+    )
 
     return (whisper_processor, whisper_model), (wav2vec_processor, wav2vec_model)
 
 def load_model_summarizers():
     print("⏳ Loading summarization models...")
-    pegasus_tokenizer = PegasusTokenizer.from_pretrained("google/pegasus-cnn_dailymail")
-    pegasus_model = PegasusForConditionalGeneration.from_pretrained("google/pegasus-cnn_dailymail")
+    ct2_convert(PEGASUS_ID, PEGASUS_CT2_DIR)
+    ct2_convert(T5_ID, T5_CT2_DIR)
+
+    # Pegasus and T5 run concurrently, so each gets half the cores
+    threads = max(1, (os.cpu_count() or 2) // 2)
+    pegasus_tokenizer = PegasusTokenizer.from_pretrained(PEGASUS_ID)
+    pegasus_model = ctranslate2.Translator(
+        str(PEGASUS_CT2_DIR), device=SUMMARY_DEVICE,
+        compute_type=SUMMARY_COMPUTE_TYPE, intra_threads=threads
+    )
 
-    t5_tokenizer = T5Tokenizer.from_pretrained("t5-base")
-    t5_model = T5ForConditionalGeneration.from_pretrained("t5-base")
+    t5_tokenizer = T5Tokenizer.from_pretrained(T5_ID)
+    t5_model = ctranslate2.Translator(
+        str(T5_CT2_DIR), device=SUMMARY_DEVICE,
+        compute_type=SUMMARY_COMPUTE_TYPE, intra_threads=threads
+    )
 
     return (pegasus_tokenizer, pegasus_model), (t5_tokenizer, t5_model)
 
+def split_chunks(audio, seconds=CHUNK_SECONDS, sr=SAMPLE_RATE):
+    """Split audio into fixed windows so long recordings run as one batch."""
+    step = seconds * sr
+    return [audio[i:i + step] for i in range(0, max(len(audio), 1), step)]
+
 def transcribe_whisper(processor, model, audio):
-    inputs = processor(audio, sampling_rate=SAMPLE_RATE, return_tensors="pt")
-    with torch.no_grad():
-        generated_ids = model.generate(inputs["input_features"])
-    transcription = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-    return transcription
-
-def transcribe_wav2vec(processor, model, audio):
-    inputs = processor(audio, sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True)
-    with torch.no_grad():
-        logits = model(inputs.input_values).logits
-    predicted_ids = torch.argmax(logits, dim=-1)
-    transcription = processor.batch_decode(predicted_ids)[0]
+    chunks = split_chunks(audio)
+    # Feature extractor pads every chunk to 30s -> [B, 80, 3000]
+    inputs = processor(chunks, sampling_rate=SAMPLE_RATE, return_tensors="np")
+    features = ctranslate2.StorageView.from_array(inputs["input_features"])
+    prompt = processor.tokenizer.convert_tokens_to_ids(WHISPER_PROMPT)
+    results = model.generate(features, [prompt] * len(chunks), beam_size=1)
+    texts = processor.batch_decode([r.sequences_ids[0] for r in results], skip_special_tokens=True)
+    return " ".join(t.strip() for t in texts)
+
+def transcribe_wav2vec(processor, session, audio):
+    chunks = split_chunks(audio)
+    inputs = processor(
+        chunks, sampling_rate=SAMPLE_RATE, return_tensors="np",
+        padding=True, return_attention_mask=True
+    )
+    feeds = {"input_values": inputs.input_values.astype(np.float32)}
+    if "attention_mask" in {i.name for i in session.get_inputs()}:
+        feeds["attention_mask"] = inputs.attention_mask.astype(np.int64)
+    logits = session.run(None, feeds)[0]
+    predicted_ids = np.argmax(logits, axis=-1)
+
+    # Frames past each chunk's real length only cover padding -> force CTC blank
+    valid = inputs.attention_mask.sum(axis=-1) // WAV2VEC_FRAME_STRIDE
+    predicted_ids[np.arange(predicted_ids.shape[1]) >= valid[:, None]] = processor.tokenizer.pad_token_id
+    transcription = " ".join(processor.batch_decode(predicted_ids))
     return transcription.lower()
 
+@lru_cache(maxsize=None)
+def prefix_tokens(tokenizer, prefix):
+    """Task prefixes never change, so tokenize them once per tokenizer."""
+    return tuple(tokenizer.convert_ids_to_tokens(tokenizer.encode(prefix, add_special_tokens=False)))
+
+def generate_summary(tokenizer, translator, text, prefix=""):
+    """Greedy decode on CTranslate2: work scales with beam_size x max tokens."""
+    head = list(prefix_tokens(tokenizer, prefix)) if prefix else []
+    body = tokenizer.encode(text, truncation=True, max_length=tokenizer.model_max_length - len(head))
+    tokens = head + tokenizer.convert_ids_to_tokens(body)
+    result = translator.translate_batch(
+        [tokens],
+        beam_size=1,
+        max_decoding_length=SUMMARY_MAX_NEW_TOKENS,
+        min_decoding_length=SUMMARY_MIN_TOKENS,
+        no_repeat_ngram_size=3,
+    )[0]
+    summary_ids = tokenizer.convert_tokens_to_ids(result.hypotheses[0])
+    return tokenizer.decode(summary_ids, skip_special_tokens=True)
+
 def summarize_pegasus(tokenizer, model, text):
-    tokens = tokenizer(text, truncation=True, padding="longest", return_tensors="pt")
-    summary_ids = model.generate(**tokens, max_length=120, min_length=25, num_beams=4)
-    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+    return generate_summary(tokenizer, model, text)
 
 def summarize_t5(tokenizer, model, text):
-    input_text = "summarize: " + text
-    tokens = tokenizer(input_text, return_tensors="pt", truncation=True, padding=True)
-    summary_ids = model.generate(**tokens, max_length=120, min_length=25, num_beams=4)
-    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+    return generate_summary(tokenizer, model, text, prefix="summarize:")
 
 def evaluate_summary(reference, generated):
-    scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
-    rouge = scorer.score(reference, generated)
-    bleu = sentence_bleu([reference.split()], generated.split())
+    rouge = _ROUGE.score(reference, generated)
+    # sacrebleu reports 0-100; keep the 0-1 scale of the metrics sheet
+    bleu = _BLEU.sentence_score(generated, [reference]).score / 100
     return rouge, bleu
 
 # ============ MAIN PIPELINE ============
@@ -92,6 +208,7 @@ def main():
     parser.add_argument("--mode", choices=["live", "file"], default="live")
     parser.add_argument("--input_file", type=str, help="Optional .wav file for 'file' mode")
     parser.add_argument("--output_dir", default="outputs")
+    parser.add_argument("--xlsx", action="store_true", help="Also write metrics as .xlsx")
     args = parser.parse_args()
 
     out = Path(args.output_dir)
@@ -109,31 +226,30 @@ def main():
             print("❌ Please provide valid --input_file for mode=file")
             return
         audio_path = args.input_file
-        audio, _ = librosa.load(audio_path, sr=SAMPLE_RATE)
+        audio = load_audio(audio_path)
 
     print("🎧 Transcribing audio...")
-    whisper_text = transcribe_whisper(whisper_proc, whisper_model, audio)
-    wav2vec_text = transcribe_wav2vec(wav2vec_proc, wav2vec_model, audio)
+    # Independent models on the same audio -> transcribe side by side
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        fw = ex.submit(transcribe_whisper, whisper_proc, whisper_model, audio)
+        fv = ex.submit(transcribe_wav2vec, wav2vec_proc, wav2vec_model, audio)
+        whisper_text, wav2vec_text = fw.result(), fv.result()
 
     print("\n📝 Generating summaries...")
-    pegasus_summary = summarize_pegasus(pegasus_tok, pegasus_model, whisper_text)
-    t5_summary = summarize_t5(t5_tok, t5_model, whisper_text)
+    # Independent models -> run both generate() calls side by side
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        fp = ex.submit(summarize_pegasus, pegasus_tok, pegasus_model, whisper_text)
+        ft = ex.submit(summarize_t5, t5_tok, t5_model, whisper_text)
+        pegasus_summary, t5_summary = fp.result(), ft.result()
 
     # ============ SAVE CSV ============
-    csv_data = pd.DataFrame([
-        {
-            "ASR Model": "Whisper",
-            "Transcription": whisper_text,
-            "Summarizer": "Pegasus",
-            "Summary": pegasus_summary
-        },
-        {
-            "ASR Model": "Wav2Vec2",
-            "Transcription": wav2vec_text,
-            "Summarizer": "T5",
-            "Summary": t5_summary
-        }
-    ])
+    results = [
+        ("Whisper", "Pegasus", whisper_text, pegasus_summary),
+        ("Wav2Vec2", "T5", wav2vec_text, t5_summary),
+    ]
+    csv_data = pd.DataFrame(
+        results, columns=["ASR Model", "Summarizer", "Transcription", "Summary"]
+    )[["ASR Model", "Transcription", "Summarizer", "Summary"]]
     csv_path = out / "transcription_summary.csv"
     csv_data.to_csv(csv_path, index=False)
     print(f"✅ CSV saved to: {csv_path}")
@@ -141,19 +257,23 @@ def main():
     # ============ SAVE METRICS ============
     print("\n📊 Evaluating summaries...")
     metrics = []
-    for _, row in csv_data.iterrows():
-        rouge, bleu = evaluate_summary(row["Transcription"], row["Summary"])
+    for asr, summ, ref, gen in results:
+        rouge, bleu = evaluate_summary(ref, gen)
         metrics.append({
-            "ASR Model": row["ASR Model"],
-            "Summarizer": row["Summarizer"],
+            "ASR Model": asr,
+            "Summarizer": summ,
             "ROUGE-1": rouge["rouge1"].fmeasure,
             "ROUGE-L": rouge["rougeL"].fmeasure,
             "BLEU": bleu
         })
     df_metrics = pd.DataFrame(metrics)
-    xlsx_path = out / "evaluation_metrics.xlsx"
-    df_metrics.to_excel(xlsx_path, index=False)
-    print(f"✅ Metrics saved to: {xlsx_path}")
+    metrics_path = out / "evaluation_metrics.csv"
+    df_metrics.to_csv(metrics_path, index=False)
+    print(f"✅ Metrics saved to: {metrics_path}")
+    if args.xlsx:
+        xlsx_path = out / "evaluation_metrics.xlsx"
+        df_metrics.to_excel(xlsx_path, index=False)
+        print(f"✅ Metrics saved to: {xlsx_path}")
 
     print("\n🏁 Pipeline complete!\n")
     print(csv_data)
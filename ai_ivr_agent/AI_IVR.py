@@ -4,21 +4,11 @@ import asyncio
 import os
 import sys
 import secrets
+import threading
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
 load_dotenv()
 
-# Core modules
-from azure_asr_tts import AzureSpeechClient
-from customer_data import generate_customers, validate_customer
-from ivr_agent import detect_intent, handle_intent_and_respond
-
-from epic_oauth import EpicOAuthClient
-from fhir_appointments import FHIRAppointmentClient
-from conversation_logger import ConversationLogger
-from summarizer import Summarizer
-from email_utils import EmailClient
-
 
 # -----------------------------------------------------------
 # Flask App Init
@@ -27,27 +17,84 @@ app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret")
 
 # -----------------------------------------------------------
-# Initialize Components
+# Lazy Components
+# Heavy modules (Azure SDK, OpenAI, pandas) are imported on first use so
+# the Flask app boots fast and /poll_auth never waits on them.
 # -----------------------------------------------------------
-generate_customers()
-speech_client = AzureSpeechClient()
-EPIC = EpicOAuthClient()
-FHIR = FHIRAppointmentClient(EPIC)
-LOGGER = ConversationLogger()
-SUMMARIZER = Summarizer()
-EMAIL = EmailClient()
+_SINGLETONS = {}
+_SINGLETON_LOCKS = {}
+
+
+def _lazy(name, factory):
+    obj = _SINGLETONS.get(name)
+    if obj is None:
+        # Per-component lock: a slow Azure init never blocks the Epic client
+        with _SINGLETON_LOCKS.setdefault(name, threading.Lock()):
+            obj = _SINGLETONS.get(name)
+            if obj is None:
+                obj = _SINGLETONS[name] = factory()
+    return obj
+
+
+def get_speech_client():
+    from azure_asr_tts import AzureSpeechClient
+    return _lazy("speech_client", AzureSpeechClient)
+
+
+def get_epic():
+    from epic_oauth import EpicOAuthClient
+    return _lazy("epic", EpicOAuthClient)
+
+
+def get_fhir():
+    from fhir_appointments import FHIRAppointmentClient
+    return _lazy("fhir", lambda: FHIRAppointmentClient(get_epic()))
+
+
+def get_logger():
+    from conversation_logger import ConversationLogger
+    return _lazy("logger", ConversationLogger)
+
+
+def get_summarizer():
+    from summarizer import Summarizer
+    return _lazy("summarizer", Summarizer)
+
+
+def get_email():
+    from email_utils import EmailClient
+    return _lazy("email", EmailClient)
+
+
+def _load_customers():
+    from customer_data import generate_customers
+    generate_customers()
+    return True
 
 
 # -----------------------------------------------------------
 # Fallback MCP Router (simple local version)
 # -----------------------------------------------------------
 class MCPRouterFallback:
-    def __init__(self):
-        self.epic = EPIC
-        self.fhir = FHIR
-        self.logger = LOGGER
-        self.summarizer = SUMMARIZER
-        self.email = EMAIL
+    @property
+    def epic(self):
+        return get_epic()
+
+    @property
+    def fhir(self):
+        return get_fhir()
+
+    @property
+    def logger(self):
+        return get_logger()
+
+    @property
+    def summarizer(self):
+        return get_summarizer()
+
+    @property
+    def email(self):
+        return get_email()
 
     # EPIC OAuth start
     def epic_start(self, session_id: str):
@@ -106,6 +153,26 @@ except:
 # Full IVR Call Flow
 # -----------------------------------------------------------
 async def simulate_call_flow():
+    from ivr_agent import LOGGER
+    LOGGER.start_new()
+    LOGGER.log("system", "Call started")
+    result = "Call failed."
+    try:
+        result = await _call_flow()
+        return result
+    finally:
+        # end of call: release the conversation log files (never build the MCP logger just to close it)
+        LOGGER.log("system", result)
+        LOGGER.close()
+        mcp_logger = _SINGLETONS.get("logger")
+        if mcp_logger is not None:
+            mcp_logger.close()
+
+
+async def _call_flow():
+    from ivr_agent import detect_intent, handle_intent_and_respond
+    speech_client = get_speech_client()
+
     await speech_client.speak("Incoming call. Connecting now.")
     user = await authenticate_user()
 
@@ -154,22 +221,40 @@ async def simulate_call_flow():
 # -----------------------------------------------------------
 # Epic Intent Handler
 # -----------------------------------------------------------
+def _epic_credentials(session_id):
+    # Refresh first: it can update the stored patient id
+    token = MCP.epic_get_access_token(session_id)
+    return token, MCP.epic_get_patient_id(session_id)
+
+
+def _summarize_call(phone):
+    convo = MCP.get_conversation(phone)
+    summary = MCP.summarize(convo)
+    get_logger().append_summary(phone, summary)
+    return summary
+
+
 async def handle_intent_with_epic(intent, user, session_id):
+    from ivr_agent import handle_intent_and_respond
+    speech_client = get_speech_client()
+
     phone = user["phone"]
     MCP.log_utterance(phone, f"intent:{intent}")
 
     if intent != "doctor_schedule":
         return await handle_intent_and_respond(intent, user, speech_client)
 
+    # Token refresh may hit Epic; run it while the prompt plays and the caller answers
+    creds_task = asyncio.create_task(asyncio.to_thread(_epic_credentials, session_id))
+
     await speech_client.speak("Which specialty do you need?")
     specialty = await speech_client.listen_once()
 
-    token = MCP.epic_get_access_token(session_id)
-    patient_id = MCP.epic_get_patient_id(session_id)
+    token, patient_id = await creds_task
 
     # Search slots
     try:
-        slots = MCP.find_slots(specialty, token)
+        slots = await asyncio.to_thread(MCP.find_slots, specialty, token)
     except Exception:
         await speech_client.speak("I couldn't find any appointments.")
         return
@@ -202,21 +287,20 @@ async def handle_intent_with_epic(intent, user, session_id):
 
     # BOOK
     try:
-        appointment = MCP.book_slot(patient_id, selected, token)
+        appointment = await asyncio.to_thread(MCP.book_slot, patient_id, selected, token)
     except Exception:
         await speech_client.speak("Error booking the appointment.")
         return
 
+    # Summary is built while the confirmation is being spoken
+    summary_task = asyncio.create_task(asyncio.to_thread(_summarize_call, phone))
     await speech_client.speak("Your appointment is booked.")
-
-    # Summary + email
-    convo = MCP.get_conversation(phone)
-    summary = MCP.summarize(convo)
-    LOGGER.append_summary(phone, summary)
+    summary = await summary_task
 
     if user.get("email"):
         try:
-            MCP.send_email_confirmation(
+            await asyncio.to_thread(
+                MCP.send_email_confirmation,
                 user["email"],
                 f"{user['first_name']} {user['last_name']}",
                 appointment,
@@ -233,6 +317,10 @@ async def handle_intent_with_epic(intent, user, session_id):
 # User Authentication
 # -----------------------------------------------------------
 async def authenticate_user():
+    from customer_data import validate_customer
+    _lazy("customers", _load_customers)
+    speech_client = get_speech_client()
+
     await speech_client.speak("Please say your registered phone number.")
     phone = await speech_client.listen_once()
 
@@ -305,4 +393,9 @@ if __name__ == "__main__":
     print("   cloudflared tunnel --url http://localhost:5000\n")
     print("⚠️ LocalTunnel removed permanently.\n")
 
+    # Warm the speech client and customer data in the background so the
+    # first call doesn't pay for it, without delaying server start.
+    threading.Thread(target=get_speech_client, daemon=True).start()
+    threading.Thread(target=_lazy, args=("customers", _load_customers), daemon=True).start()
+
     app.run(host="0.0.0.0", port=port)
@@ -2,6 +2,7 @@
 import azure.cognitiveservices.speech as speechsdk
 import os
 import asyncio
+import threading
 
 class AzureSpeechClient:
     def __init__(self):
@@ -27,18 +28,36 @@ class AzureSpeechClient:
         # Audio output
         self.audio_output = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
 
+        # Build the synthesizer/recognizer once and reuse them for every turn.
+        # The SDK objects aren't reentrant and Flask may serve calls from
+        # several threads/event loops, so guard each with a thread lock.
+        self.synth = speechsdk.SpeechSynthesizer(
+            speech_config=self.speech_config,
+            audio_config=self.audio_output
+        )
+        self.recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self.speech_config,
+            audio_config=speechsdk.audio.AudioConfig(use_default_microphone=True)
+        )
+        self._synth_lock = threading.Lock()
+        self._recognizer_lock = threading.Lock()
+
+        # Pre-warm: open the service connections now instead of on first use
+        try:
+            speechsdk.Connection.from_speech_synthesizer(self.synth).open(True)
+            speechsdk.Connection.from_recognizer(self.recognizer).open(False)
+        except Exception as e:
+            print("[SPEECH WARMUP ERROR]", e)
+
     # ----------------------------------------------------------------------
     # SYNTHESIZE SPEECH
     # ----------------------------------------------------------------------
     async def speak(self, text: str):
         """Speak text out loud using Azure TTS."""
         try:
-            synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=self.speech_config,
-                audio_config=self.audio_output
-            )
             print(f"[TTS] {text}")
-            result = synthesizer.speak_text_async(text).get()
+            # Block in a worker thread so the event loop can overlap other work
+            result = await asyncio.to_thread(self._speak_blocking, text)
 
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
                 return True
@@ -50,6 +69,14 @@ class AzureSpeechClient:
             print("\n[SPEAK ERROR]\n", e)
             return False
 
+    def _speak_blocking(self, text: str):
+        with self._synth_lock:
+            return self.synth.speak_text_async(text).get()
+
+    def _recognize_once(self):
+        with self._recognizer_lock:
+            return self.recognizer.recognize_once()
+
     # ----------------------------------------------------------------------
     # CAPTURE USER SPEECH
     # ----------------------------------------------------------------------
@@ -60,19 +87,11 @@ class AzureSpeechClient:
         """
 
         try:
-            # Microphone input
-            audio_in = speechsdk.audio.AudioConfig(use_default_microphone=True)
-
-            recognizer = speechsdk.SpeechRecognizer(
-                speech_config=self.speech_config,
-                audio_config=audio_in
-            )
-
             print("[ASR] Listening...")
 
             # Run async recognition in a thread
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, recognizer.recognize_once)
+            result = await loop.run_in_executor(None, self._recognize_once)
 
             if result.reason == speechsdk.ResultReason.RecognizedSpeech:
                 print("[ASR RESULT]", result.text)
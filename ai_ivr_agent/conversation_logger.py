@@ -1,14 +1,15 @@
 # conversation_logger.py
 import os
-import json
+import orjson
 from datetime import datetime
 from pathlib import Path
 
 
 class ConversationLogger:
     """
-    Simple JSON logger for IVR calls.
-    Each call gets its own file: logs/2025-02-01_12-55-22.json
+    Simple JSON-lines logger for IVR calls.
+    Each call gets its own file: logs/2025-02-01_12-55-22.jsonl
+    Entries are appended one per line, so logging cost doesn't grow with the call.
     """
 
     def __init__(self, base_dir="logs"):
@@ -16,15 +17,18 @@ class ConversationLogger:
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.current_file = None
         self.buffer = []
+        self._fh = None
 
     # -----------------------------------------------------------
     # START NEW LOG
     # -----------------------------------------------------------
     def start_new(self):
+        self.close()
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = self.base_dir / f"{timestamp}.json"
+        filename = self.base_dir / f"{timestamp}.jsonl"
         self.current_file = filename
         self.buffer = []
+        self._fh = open(filename, "ab")
         return filename
 
     # -----------------------------------------------------------
@@ -40,31 +44,41 @@ class ConversationLogger:
             entry["metadata"] = metadata
 
         self.buffer.append(entry)
-        self._write()
+        self._write(entry)
 
     # -----------------------------------------------------------
-    # WRITE TO FILE
+    # APPEND TO FILE
     # -----------------------------------------------------------
-    def _write(self):
-        if not self.current_file:
+    def _write(self, entry: dict):
+        if not self._fh:
             return
 
-        with open(self.current_file, "w", encoding="utf-8") as f:
-            json.dump(self.buffer, f, indent=2)
+        self._fh.write(orjson.dumps(entry) + b"\n")
+        # flush per entry: a crash mid-call must not lose the lines already logged
+        self._fh.flush()
+
+    # -----------------------------------------------------------
+    # END OF CALL: FLUSH + CLOSE
+    # -----------------------------------------------------------
+    def close(self):
+        if self._fh:
+            self._fh.flush()
+            self._fh.close()
+            self._fh = None
 
     # -----------------------------------------------------------
     # GET ALL LOGS
     # -----------------------------------------------------------
     def get_all_logs(self):
-        return sorted(self.base_dir.glob("*.json"))
+        return sorted(self.base_dir.glob("*.jsonl"))
 
     # -----------------------------------------------------------
     # READ ONE LOG
     # -----------------------------------------------------------
     def read_log(self, file_path):
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(file_path, "rb") as f:
+                return [orjson.loads(line) for line in f if line.strip()]
         except:
             return None
 
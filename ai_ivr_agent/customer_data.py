@@ -4,8 +4,31 @@ import pandas as pd
 import random
 from faker import Faker
 import re
+import threading
 
 DATA_PATH = Path("data/customers.xlsx")
+_DIGIT_RE = re.compile(r"\D")
+
+# data file -> (source mtime, {(phone_last10, last4ssn, dob): customer record})
+_CUST_INDEX = {}
+_INDEX_LOCK = threading.RLock()
+
+def _parquet_path(path: Path):
+    return path.with_suffix(".parquet")
+
+def _with_phone_norm(df: pd.DataFrame):
+    """
+    Adds the last-10-digit phone column used for lookups (one vectorized pass).
+    """
+    df["phone_norm"] = df["phone"].astype(str).str.replace(_DIGIT_RE, "", regex=True).str[-10:]
+    return df
+
+def _write_parquet(df: pd.DataFrame, path: Path):
+    """
+    Stores a string-typed Parquet copy (with phone_norm precomputed) next to
+    the Excel file; it loads far faster than re-parsing the XLSX.
+    """
+    _with_phone_norm(df.astype(str)).to_parquet(_parquet_path(path), index=False)
 
 def generate_customers(n=1000, path=DATA_PATH):
     """
@@ -18,6 +41,8 @@ def generate_customers(n=1000, path=DATA_PATH):
     path.parent.mkdir(parents=True, exist_ok=True)
     if path.exists():
         print(f"Customer data file exists: {path}")
+        if not _parquet_path(path).exists():
+            _write_parquet(pd.read_excel(path, dtype=str), path)
         return
     fake = Faker()
     rows = []
@@ -39,6 +64,9 @@ def generate_customers(n=1000, path=DATA_PATH):
         })
     df = pd.DataFrame(rows)
     df.to_excel(path, index=False)
+    _write_parquet(df, path)
+    with _INDEX_LOCK:
+        _CUST_INDEX.pop(path, None)
     print(f"{n} sample customers created at {path}")
 
 def _normalize_digits(s: str):
@@ -47,7 +75,34 @@ def _normalize_digits(s: str):
     """
     if not s:
         return ""
-    return re.sub(r"\D", "", s)
+    return _DIGIT_RE.sub("", s)
+
+def _load_index(path: Path):
+    """
+    Loads the customer file once and indexes it by (phone_last10, last4ssn, dob)
+    so each validation is a dict lookup instead of a full scan. The index is
+    rebuilt only when the source file's mtime changes.
+    """
+    mtime = path.stat().st_mtime
+    cached = _CUST_INDEX.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _INDEX_LOCK:
+        # another thread may have rebuilt it while we waited
+        cached = _CUST_INDEX.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        pq = _parquet_path(path)
+        fresh = pq.exists() and pq.stat().st_mtime >= mtime
+        df = pd.read_parquet(pq) if fresh else pd.read_excel(path, dtype=str)
+        if "phone_norm" not in df.columns:
+            _with_phone_norm(df)
+        index = {
+            (rec["phone_norm"], rec["last4ssn"], rec["dob"]): rec
+            for rec in df.to_dict("records")
+        }
+        _CUST_INDEX[path] = (mtime, index)
+        return index
 
 def validate_customer(phone_spoken: str, last4_spoken: str, dob_spoken: str, path=DATA_PATH):
     """
@@ -68,21 +123,22 @@ def validate_customer(phone_spoken: str, last4_spoken: str, dob_spoken: str, pat
     dob_norm = dob_spoken.strip()
 
     # Normalize DOB if written as digits (e.g., "11101986" → "11/10/1986")
-    raw_digits = re.sub(r"\D", "", dob_norm)
+    raw_digits = _normalize_digits(dob_norm)
     if len(raw_digits) == 8:
         dob_norm = f"{raw_digits[0:2]}/{raw_digits[2:4]}/{raw_digits[4:8]}"
 
-    # Load data
-    df = pd.read_excel(path, dtype=str)
-    df['phone_norm'] = df['phone'].astype(str).str.replace(r"\D", "", regex=True).str[-10:]
+    match = _load_index(path).get((phone_digits[-10:], last4, dob_norm))
+    return dict(match) if match else None
 
-    # Filter data by phone, last4ssn, and dob
-    match = df[
-        (df['phone_norm'].str.endswith(phone_digits[-10:])) &
-        (df['last4ssn'] == last4) &
-        (df['dob'] == dob_norm)
-    ]
+def preload(path=DATA_PATH):
+    """
+    Builds the index up front so request handlers only do a dict lookup.
+    Cheap once loaded (mtime check); safe to call again, e.g. after the file changes.
+    """
+    try:
+        if path.exists():
+            _load_index(path)
+    except Exception as e:
+        print(f"Could not preload customer index: {e}")
 
-    if not match.empty:
-        return match.iloc[0].to_dict()
-    return None
+preload()
@@ -1,6 +1,7 @@
 # email_utils.py
 import os
 import smtplib
+import threading
 from email.message import EmailMessage
 
 class EmailClient:
@@ -18,9 +19,33 @@ class EmailClient:
         if not all([self.host, self.port, self.user, self.password]):
             print("⚠️ EmailClient missing SMTP environment variables")
 
+        # One logged-in SMTP session, reused across sends
+        self._smtp = None
+        self._lock = threading.Lock()
+
     # ------------------------------------------------------------------
-    # INTERNAL HELPER
+    # INTERNAL HELPERS
     # ------------------------------------------------------------------
+    def _get_conn(self):
+        if self._smtp is None:
+            if self.port == 465:
+                # Implicit TLS: no STARTTLS round-trip
+                smtp = smtplib.SMTP_SSL(self.host, self.port)
+            else:
+                smtp = smtplib.SMTP(self.host, self.port)
+                smtp.starttls()
+            smtp.login(self.user, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _reset_conn(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
     def _send(self, to_email: str, subject: str, body: str):
         msg = EmailMessage()
         msg["From"] = self.user
@@ -28,10 +53,17 @@ class EmailClient:
         msg["Subject"] = subject
         msg.set_content(body)
 
-        with smtplib.SMTP(self.host, self.port) as server:
-            server.starttls()
-            server.login(self.user, self.password)
-            server.send_message(msg)
+        with self._lock:
+            try:
+                self._get_conn().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Server dropped the idle session -> reconnect once
+                self._reset_conn()
+                self._get_conn().send_message(msg)
+
+    def close(self):
+        with self._lock:
+            self._reset_conn()
 
     # ------------------------------------------------------------------
     # SEND APPOINTMENT CONFIRMATION
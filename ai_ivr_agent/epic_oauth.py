@@ -9,11 +9,17 @@ Epic OAuth helper (STU3 usage)
 import os
 import time
 import base64
-import json
 import secrets
 import hashlib
-from urllib.parse import urlencode
+import functools
+import re
+import sqlite3
+import threading
+import orjson
+from urllib.parse import urlencode, quote
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Read environment (set these in your .env):
 # EPIC_CLIENT_ID, EPIC_CLIENT_SECRET (optional), EPIC_AUTH_BASE (oauth base), EPIC_FHIR_BASE (FHIR base - STU3),
@@ -27,29 +33,175 @@ EPIC_FHIR_BASE = os.getenv("EPIC_FHIR_BASE")  # e.g. https://fhir.epic.com/inter
 REDIRECT_URI = os.getenv("EPIC_REDIRECT_URI")
 SCOPE = os.getenv("EPIC_SCOPE", "launch/patient patient/Appointment.write patient/Slot.read openid fhirUser offline_access")
 
-# in-memory session store: session_id -> token info + pkce verifier + fhir patient id
-_SESSIONS = {}
+# session store: session_id -> token info + pkce verifier + fhir patient id
+# persisted in SQLite (WAL) so sessions survive reloads and are shared across workers
+# tokens live here, so the default is a per-user cache dir outside the repo, readable only by us
+SESSION_DB = os.getenv("EPIC_SESSION_DB") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ai_ivr_agent", "sessions.db"
+)
+SESSION_MAX = int(os.getenv("EPIC_SESSION_MAX", "10000"))
+SESSION_TTL = int(os.getenv("EPIC_SESSION_TTL", "3600"))  # idle seconds since last read/write
+SESSION_TOUCH_SLACK = 60  # only rewrite a row's expiry on read when it moves by more than this
+SESSION_EXPIRED_GRACE = 600  # keep a dead (non-refreshable) token this long past expiry
+SESSION_GC_INTERVAL = 60
+
+class _SessionStore:
+    """
+    SQLite-backed, size + TTL bounded store of session buckets (one orjson blob per row).
+    Supports the dict calls the client uses: [] / get / setdefault / in / pop.
+    Buckets are copies: write them back with store[session_id] = bucket after mutating.
+    """
+    def __init__(self, path=SESSION_DB, maxsize=SESSION_MAX, ttl=SESSION_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._last_gc = 0.0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+            # create owner-only up front; SQLite gives the -wal/-shm files the same mode
+            os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+            os.chmod(path, 0o600)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS s(id TEXT PRIMARY KEY, blob BLOB, exp REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS s_exp ON s(exp)")
+
+    def _expiry(self, now, bucket):
+        # idle TTL; only a token that can't be refreshed is also capped by its own expiry
+        exp = now + self.ttl
+        tok = bucket.get("token")
+        if tok and not tok.get("refresh_token"):
+            exp = min(exp, tok.get("expires_at", now) + SESSION_EXPIRED_GRACE)
+        return exp
+
+    def _gc(self, now):
+        if now - self._last_gc < SESSION_GC_INTERVAL:
+            return
+        self._last_gc = now
+        self._conn.execute("DELETE FROM s WHERE exp < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM s WHERE id IN (SELECT id FROM s ORDER BY exp DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def __setitem__(self, key, bucket):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO s(id, blob, exp) VALUES (?, ?, ?)",
+                (key, orjson.dumps(bucket), self._expiry(now, bucket)),
+            )
+            self._gc(now)
+
+    def __getitem__(self, key):
+        bucket = self.get(key)
+        if bucket is None:
+            raise KeyError(key)
+        return bucket
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM s WHERE exp >= ?", (time.time(),)).fetchone()[0]
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob, exp FROM s WHERE id = ? AND exp >= ?", (key, now)
+            ).fetchone()
+            if not row:
+                return default
+            bucket = orjson.loads(row[0])
+            # reads count as activity: slide the idle TTL, as the old TTLCache did
+            exp = self._expiry(now, bucket)
+            if exp - row[1] > SESSION_TOUCH_SLACK:
+                self._conn.execute("UPDATE s SET exp = ? WHERE id = ?", (exp, key))
+        return bucket
+
+    def setdefault(self, key, default=None):
+        with self._lock:
+            bucket = self.get(key)
+            if bucket is None:
+                bucket = default
+                self[key] = bucket
+            return bucket
+
+    def pop(self, key, default=None):
+        with self._lock:
+            bucket = self.get(key, default)
+            self._conn.execute("DELETE FROM s WHERE id = ?", (key,))
+            return bucket
+
+_SESSIONS = _SessionStore()
+
+# single-flight token refresh: one lock stripe per session id hash (bounded, no per-session cleanup)
+_REFRESH_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+def _refresh_lock(session_id: str):
+    return _REFRESH_LOCKS[hash(session_id) % len(_REFRESH_LOCKS)]
+
+# shared keep-alive HTTP session: token exchange + refresh reuse one TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+))
 
 # ---------------- PKCE helpers ----------------
 def _make_pkce_pair():
-    # RFC7636 PKCE pair
-    verifier = base64.urlsafe_b64encode(secrets.token_bytes(40)).rstrip(b"=").decode("ascii")
+    # RFC7636 PKCE pair; token_urlsafe already returns unpadded base64url (54 chars for 40 bytes)
+    verifier = secrets.token_urlsafe(40)
     digest = hashlib.sha256(verifier.encode("ascii")).digest()
     challenge = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
     return verifier, challenge
 
+# cached: a refresh often returns the same id_token; callers only read the claims
+@functools.lru_cache(maxsize=256)
 def _safe_b64_json_decode(b64_str):
     try:
-        padded = b64_str + "=" * ((4 - len(b64_str) % 4) % 4)
-        decoded = base64.urlsafe_b64decode(padded)
-        return json.loads(decoded)
+        pad = -len(b64_str) & 3
+        return orjson.loads(base64.urlsafe_b64decode(b64_str + "=" * pad))
     except Exception:
         return {}
 
+_PAT_RE = re.compile(r"/Patient/([^/?#]+)")
+
+@functools.lru_cache(maxsize=128)
+def _extract_patient(id_token: str):
+    # id_token may include fhirUser -> ".../Patient/{id}" or "Practitioner/..."
+    if "." not in id_token:
+        return None
+    fhir_user = _safe_b64_json_decode(id_token.split(".")[1]).get("fhirUser")
+    m = _PAT_RE.search(fhir_user) if fhir_user else None
+    return m.group(1) if m else None
+
 # ---------------- EpicOAuthClient ----------------
 class EpicOAuthClient:
     def __init__(self):
         self.sessions = _SESSIONS
+        self._s = _SESSION
+
+        # Only state + code_challenge vary per authorize URL; encode the rest once
+        self._authorize_static = urlencode({
+            "client_id": EPIC_CLIENT_ID,
+            "response_type": "code",
+            "redirect_uri": REDIRECT_URI,
+            "scope": SCOPE,
+            "code_challenge_method": "S256",
+            "aud": EPIC_FHIR_BASE
+        })
+
+        # Basic auth header never changes at runtime -> encode once
+        if EPIC_CLIENT_SECRET:
+            basic = base64.b64encode(f"{EPIC_CLIENT_ID}:{EPIC_CLIENT_SECRET}".encode()).decode()
+            self._basic_header = {"Authorization": f"Basic {basic}"}
+        else:
+            self._basic_header = {}
 
         # sanity checks
         if not EPIC_CLIENT_ID or not REDIRECT_URI or not EPIC_FHIR_BASE:
@@ -67,19 +219,14 @@ class EpicOAuthClient:
     # build authorize URL (includes PKCE code challenge)
     def build_authorize_url(self, session_id: str):
         verifier, challenge = _make_pkce_pair()
-        self.sessions.setdefault(session_id, {})["pkce_verifier"] = verifier
+        sess = self.sessions.setdefault(session_id, {})
+        sess["pkce_verifier"] = verifier
+        self.sessions[session_id] = sess
 
-        params = {
-            "client_id": EPIC_CLIENT_ID,
-            "response_type": "code",
-            "redirect_uri": REDIRECT_URI,
-            "scope": SCOPE,
-            "state": session_id,
-            "code_challenge": challenge,
-            "code_challenge_method": "S256",
-            "aud": EPIC_FHIR_BASE
-        }
-        return EPIC_AUTHORIZE_URL + "?" + urlencode(params)
+        return (
+            f"{EPIC_AUTHORIZE_URL}?{self._authorize_static}"
+            f"&state={quote(session_id, safe='')}&code_challenge={challenge}"
+        )
 
     # exchange code for tokens
     def redeem_code_for_token(self, code: str, session_id: str):
@@ -100,16 +247,12 @@ class EpicOAuthClient:
             "aud": EPIC_FHIR_BASE
         }
 
-        # If client secret present, some apps use Basic auth or client_secret in body.
-        headers = {}
-        if EPIC_CLIENT_SECRET:
-            # Use basic auth header (Epic accepts this for confidential apps)
-            basic = base64.b64encode(f"{EPIC_CLIENT_ID}:{EPIC_CLIENT_SECRET}".encode()).decode()
-            headers["Authorization"] = f"Basic {basic}"
+        # If client secret present, use basic auth header (Epic accepts this for confidential apps)
+        headers = dict(self._basic_header)
 
-        r = requests.post(EPIC_TOKEN_URL, data=data, headers=headers, timeout=30)
+        r = self._s.post(EPIC_TOKEN_URL, data=data, headers=headers, timeout=30)
         r.raise_for_status()
-        tok = r.json()
+        tok = orjson.loads(r.content)
 
         # store token + expiry
         tok["expires_at"] = time.time() + int(tok.get("expires_in", 3600))
@@ -124,17 +267,14 @@ class EpicOAuthClient:
         if not fhir_patient and "patient" in tok:
             fhir_patient = tok.get("patient")
 
-        # id_token may include fhirUser -> "Patient/{id}" or "Practitioner/..."
         id_token = tok.get("id_token")
         if not fhir_patient and id_token:
-            claims = _safe_b64_json_decode(id_token.split(".")[1]) if "." in id_token else {}
-            fhir_user = claims.get("fhirUser")
-            if fhir_user and "/Patient/" in fhir_user:
-                fhir_patient = fhir_user.split("/Patient/")[-1]
+            fhir_patient = _extract_patient(id_token)
 
         if fhir_patient:
             sess["fhir_patient_id"] = fhir_patient
 
+        self.sessions[session_id] = sess
         return tok
 
     # check presence of token (does not ensure fresh)
@@ -152,6 +292,18 @@ class EpicOAuthClient:
         # still valid
         if time.time() < tok.get("expires_at", 0) - 10:
             return tok.get("access_token")
+
+        # only one refresh per session in flight; waiters pick up the stored result
+        with _refresh_lock(session_id):
+            sess = self.sessions.get(session_id)
+            if not sess or not sess.get("token"):
+                return None
+            tok = sess["token"]
+            if time.time() < tok.get("expires_at", 0) - 10:
+                return tok.get("access_token")
+            return self._refresh(session_id, sess, tok)
+
+    def _refresh(self, session_id: str, sess: dict, tok: dict):
         # attempt refresh
         refresh = tok.get("refresh_token")
         if not refresh:
@@ -163,23 +315,20 @@ class EpicOAuthClient:
             "client_id": EPIC_CLIENT_ID,
             "aud": EPIC_FHIR_BASE
         }
-        headers = {}
-        if EPIC_CLIENT_SECRET:
-            basic = base64.b64encode(f"{EPIC_CLIENT_ID}:{EPIC_CLIENT_SECRET}".encode()).decode()
-            headers["Authorization"] = f"Basic {basic}"
+        headers = dict(self._basic_header)
 
-        r = requests.post(EPIC_TOKEN_URL, data=data, headers=headers, timeout=30)
+        r = self._s.post(EPIC_TOKEN_URL, data=data, headers=headers, timeout=30)
         r.raise_for_status()
-        newtok = r.json()
+        newtok = orjson.loads(r.content)
         newtok["expires_at"] = time.time() + int(newtok.get("expires_in", 3600))
         sess["token"] = newtok
         # try re-extract patient id again
         id_token = newtok.get("id_token")
         if id_token:
-            claims = _safe_b64_json_decode(id_token.split(".")[1]) if "." in id_token else {}
-            fhir_user = claims.get("fhirUser")
-            if fhir_user and "/Patient/" in fhir_user:
-                sess["fhir_patient_id"] = fhir_user.split("/Patient/")[-1]
+            fhir_patient = _extract_patient(id_token)
+            if fhir_patient:
+                sess["fhir_patient_id"] = fhir_patient
+        self.sessions[session_id] = sess
         return newtok.get("access_token")
 
     def get_fhir_patient_id(self, session_id: str):
@@ -9,13 +9,36 @@ Usage: instantiate with EpicOAuthClient instance (to obtain token when needed).
 """
 
 import os
-import requests
+import re
+import httpx
 from datetime import datetime, timedelta
-import json
+import orjson
 
 EPIC_FHIR_BASE = os.getenv("EPIC_FHIR_BASE", "https://fhir.epic.com/interconnect-fhir-stu3/api/FHIR/STU3")
 EPIC_FHIR_BASE = EPIC_FHIR_BASE.rstrip("/")
 
+# "2025-01-01T09:30:00Z" -> "2025-01-01 09:30:00 UTC" in one pass
+_HUMAN_TIME_TBL = str.maketrans({"T": " ", "Z": " UTC"})
+
+# shared HTTP/2 client: $find, $book and reads multiplex over one TLS connection
+_SESSION = httpx.Client(
+    http2=True,
+    timeout=30,
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,  # connect errors only; httpx does not retry on status codes
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=4)
+    ),
+    headers={
+        "Accept": "application/fhir+json",
+        "Content-Type": "application/fhir+json"
+    }
+)
+
+# FHIR id: [A-Za-z0-9\-\.]{1,64} -> safe to splice into the JSON template as-is
+_FHIR_ID_RE = re.compile(r"[A-Za-z0-9\-.]{1,64}")
+_FHIR_TS = "%Y-%m-%dT%H:%M:%SZ"
+
 class FHIRAppointmentClient:
     def __init__(self, epic_client):
         """
@@ -23,13 +46,21 @@ class FHIRAppointmentClient:
         """
         self.epic = epic_client
         self.base = EPIC_FHIR_BASE
+        self._s = _SESSION
+
+        # $find Parameters body encoded once; only patient id + window vary per call
+        self._find_tpl = orjson.dumps({
+            "resourceType": "Parameters",
+            "parameter": [
+                {"name": "patient", "resource": {"resourceType": "Patient", "id": "__PID__"}},
+                {"name": "startTime", "valueDateTime": "__START__"},
+                {"name": "endTime", "valueDateTime": "__END__"}
+            ]
+        })
 
     def _headers(self, access_token):
-        return {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/fhir+json",
-            "Content-Type": "application/fhir+json"
-        }
+        # Accept/Content-Type are session defaults
+        return {"Authorization": f"Bearer {access_token}"}
 
     # -------------------- Appointment.$find --------------------
     def find_slots(self, patient_id: str, access_token: str,
@@ -51,73 +82,67 @@ class FHIRAppointmentClient:
         if end_dt is None:
             end_dt = start_dt + timedelta(days=14)
 
-        # Build Parameters body as described by Epic STU3 docs:
-        # parameter: patient (resource Patient), startTime, endTime, serviceType (valueCodeableConcept)
-        params_body = {
-            "resourceType": "Parameters",
-            "parameter": [
-                {
-                    "name": "patient",
-                    "resource": {
-                        "resourceType": "Patient",
-                        "id": patient_id
-                    }
-                },
-                {
-                    "name": "startTime",
-                    "valueDateTime": start_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-                },
-                {
-                    "name": "endTime",
-                    "valueDateTime": end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-                }
-            ]
-        }
+        pid = str(patient_id)
+        # anything outside the FHIR id alphabet gets proper JSON string escaping
+        pid = pid.encode("ascii") if _FHIR_ID_RE.fullmatch(pid) else orjson.dumps(pid)[1:-1]
 
+        # Parameters body as described by Epic STU3 docs:
+        # parameter: patient (resource Patient), startTime, endTime, serviceType (valueCodeableConcept)
+        body = (
+            self._find_tpl
+            .replace(b"__PID__", pid)
+            .replace(b"__START__", start_dt.strftime(_FHIR_TS).encode("ascii"))
+            .replace(b"__END__", end_dt.strftime(_FHIR_TS).encode("ascii"))
+        )
+
+        extra = []
         if service_code:
-            params_body["parameter"].append({
+            extra.append({
                 "name": "serviceType",
                 "valueCodeableConcept": {"coding": [service_code]}
             })
 
         # Optional specialty text passed as a free-text param (some orgs accept it)
         if specialty_text:
-            params_body["parameter"].append({
+            extra.append({
                 "name": "specialty",
                 "valueString": specialty_text
             })
 
+        if extra:
+            # splice before the closing "]}" of the parameter list
+            body = body[:-2] + b"," + b",".join(map(orjson.dumps, extra)) + b"]}"
+
         url = f"{self.base}/Appointment/$find"
-        r = requests.post(url, headers=self._headers(access_token), json=params_body, timeout=30)
+        r = self._s.post(url, headers=self._headers(access_token), content=body)
         r.raise_for_status()
-        bundle = r.json()
+        bundle = orjson.loads(r.content)
 
         # Parse returned Bundle entries into a simplified list
-        results = []
-        for entry in bundle.get("entry", []):
-            resource = entry.get("resource", {}) or entry.get("resource")
-            # Appointment resource in STU3 may contain contained Slot or a Slot reference
-            appt_id = resource.get("id")
-            start = resource.get("start") or (resource.get("contained") and resource.get("contained")[0].get("start") if resource.get("contained") else None)
-            end = resource.get("end") or (resource.get("contained") and resource.get("contained")[0].get("end") if resource.get("contained") else None)
-            # try to display provider/location
-            practitioner_display = None
-            participants = resource.get("participant", [])
-            for p in participants:
-                actor = p.get("actor", {})
-                if actor and actor.get("display"):
-                    practitioner_display = actor.get("display")
-                    break
-            results.append({
-                "appointment_id": appt_id,
-                "resource": resource,
-                "start": start,
-                "end": end,
-                "start_human": start.replace("T", " ").replace("Z", " UTC") if start else "unknown",
-                "practitioner_display": practitioner_display
-            })
-
-        return results
+        return [self._simplify_entry(entry) for entry in bundle.get("entry", [])]
+
+    @staticmethod
+    def _simplify_entry(entry: dict):
+        resource = entry.get("resource") or {}
+        # Appointment resource in STU3 may contain contained Slot or a Slot reference
+        contained = resource.get("contained")
+        first = contained[0] if contained else {}
+        start = resource.get("start") or first.get("start")
+        end = resource.get("end") or first.get("end")
+        # try to display provider/location
+        practitioner_display = next(
+            (p["actor"]["display"] for p in resource.get("participant", [])
+             if (p.get("actor") or {}).get("display")),
+            None
+        )
+        return {
+            "appointment_id": resource.get("id"),
+            "resource": resource,
+            "start": start,
+            "end": end,
+            "start_human": start.translate(_HUMAN_TIME_TBL) if start else "unknown",
+            "practitioner_display": practitioner_display
+        }
 
     # -------------------- Appointment.$book --------------------
     def book_appointment(self, patient_id: str, appointment_id: str, access_token: str, reason: str = None):
@@ -143,13 +168,13 @@ class FHIRAppointmentClient:
             params["parameter"].append({"name": "comment", "valueString": reason})
 
         url = f"{self.base}/Appointment/$book"
-        r = requests.post(url, headers=self._headers(access_token), json=params, timeout=30)
+        r = self._s.post(url, headers=self._headers(access_token), content=orjson.dumps(params))
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
 
     # -------------------- Convenience: read appointment by id --------------------
     def read_appointment(self, appointment_id: str, access_token: str):
         url = f"{self.base}/Appointment/{appointment_id}"
-        r = requests.get(url, headers=self._headers(access_token), timeout=30)
+        r = self._s.get(url, headers=self._headers(access_token))
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
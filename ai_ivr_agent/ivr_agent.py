@@ -1,18 +1,36 @@
 # ivr_agent.py
 import re
+from functools import lru_cache
 from conversation_logger import ConversationLogger
 
 LOGGER = ConversationLogger()
 
+# keyword -> intent; earlier intents win when several keywords appear
+_INTENT_KEYWORDS = {
+    "benefit": "benefit_eligibility",
+    "eligible": "benefit_eligibility",
+    "eligibility": "benefit_eligibility",
+    "coverage": "benefit_eligibility",
+    "doctor": "doctor_schedule",
+    "appointment": "doctor_schedule",
+    "schedule": "doctor_schedule",
+    "book": "doctor_schedule",
+    "password": "password_reset",
+    "reset": "password_reset",
+    "sign in": "password_reset",
+    "login": "password_reset",
+}
+_INTENT_PRIORITY = ("benefit_eligibility", "doctor_schedule", "password_reset")
+_INTENT_RE = re.compile("|".join(map(re.escape, _INTENT_KEYWORDS)))
+
 def detect_intent(text: str):
-    txt = (text or "").lower()
-    if any(k in txt for k in ["benefit", "eligible", "eligibility", "coverage"]):
-        return "benefit_eligibility"
-    if any(k in txt for k in ["doctor", "appointment", "schedule", "book"]):
-        return "doctor_schedule"
-    if any(k in txt for k in ["password", "reset", "sign in", "login"]):
-        return "password_reset"
-    return "general"
+    return _detect_intent_normalized((text or "").lower())
+
+@lru_cache(maxsize=512)
+def _detect_intent_normalized(txt: str):
+    # one regex scan instead of one substring pass per intent
+    found = {_INTENT_KEYWORDS[k] for k in _INTENT_RE.findall(txt)}
+    return next((intent for intent in _INTENT_PRIORITY if intent in found), "general")
 
 async def handle_intent_and_respond(intent: str, user_record: dict, speech_client):
     if intent == "benefit_eligibility":
@@ -1,16 +1,19 @@
 import os
 import sys
+import logging
 import time
+import threading
 import sounddevice as sd
-from scipy.io.wavfile import write
 from dotenv import load_dotenv
-import pandas as pd
-import azure.cognitiveservices.speech as speechsdk
-from openai import AzureOpenAI
+from openpyxl import load_workbook
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # ----------------- Load environment -----------------
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
@@ -23,6 +26,11 @@ DATA_PATH = os.getenv(
     os.path.join(os.getcwd(), "customers_us.xlsx")
 )
 
+# Customer cache: rows indexed by last-10 phone digits, reloaded when the file changes
+_PHONE_TBL = str.maketrans("", "", " -()\t\r\n")
+_CUST_CACHE = {"mtime": None, "by_phone": {}}
+_CUST_LOCK = threading.RLock()
+
 # ----------------- Validations -----------------
 if not SPEECH_KEY or not SPEECH_REGION:
     print("❌ Missing SPEECH_KEY or SPEECH_REGION in .env")
@@ -35,87 +43,191 @@ if not os.path.exists(DATA_PATH):
     sys.exit(1)
 
 # ----------------- Initialize Clients -----------------
-speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-speech_config.speech_recognition_language = "en-US"
+# The Speech SDK and openai are imported on first use so importing this module stays cheap.
+_CLIENTS = {}
+
+
+def _get_speech_config():
+    speech_config = _CLIENTS.get("speech_config")
+    if speech_config is None:
+        import azure.cognitiveservices.speech as speechsdk
+        speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
+        speech_config.speech_recognition_language = "en-US"
+        _CLIENTS["speech_config"] = speech_config
+    return speech_config
 
-try:
-    openai_client = AzureOpenAI(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_KEY,
-        api_version="2024-08-01-preview"
-    )
-except Exception as e:
-    print("⚠️ Could not initialize Azure OpenAI client:", e)
-    openai_client = None
+
+def _get_openai_client():
+    openai_client = _CLIENTS.get("openai")
+    if openai_client is None:
+        from openai import AzureOpenAI
+        try:
+            openai_client = AzureOpenAI(
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                api_key=AZURE_OPENAI_KEY,
+                api_version="2024-08-01-preview"
+            )
+        except Exception as e:
+            logger.warning("Could not initialize Azure OpenAI client: %s", e)
+            return None
+        _CLIENTS["openai"] = openai_client
+    return openai_client
 
 
 # ----------------- RECORD AUDIO -----------------
-def record_audio(filename="input.wav", duration=8, fs=16000):
-    print(f"\n🎤 Recording for {duration} seconds — speak now!")
-    audio = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype="int16")
-    sd.wait()
-    write(filename, fs, audio)
-    print(f"✅ Saved audio as: {filename}")
-    return filename
+def record_audio(push_stream, duration=8, fs=16000):
+    """
+    Feed `duration` seconds of 16-bit mono mic audio straight into an Azure push stream.
+    Nothing touches the disk; the recognizer consumes frames while the caller is still talking.
+    """
+    logger.info("🎤 Recording for %d seconds — speak now!", duration)
+    with sd.InputStream(
+        samplerate=fs, channels=1, dtype="int16",
+        callback=lambda indata, frames, t, status: push_stream.write(bytes(indata)),
+    ):
+        sd.sleep(int(duration * 1000))
+    push_stream.close()  # end-of-stream -> recognizer finishes the last phrase
+    logger.debug("Recording finished.")
 
 
 # ----------------- TRANSCRIBE AUDIO -----------------
-def transcribe_audio(filename):
+def transcribe_audio(duration=8, fs=16000):
+    import azure.cognitiveservices.speech as speechsdk
+
     try:
-        audio_config = speechsdk.AudioConfig(filename=filename)
-        recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
+        fmt = speechsdk.audio.AudioStreamFormat(samples_per_second=fs, bits_per_sample=16, channels=1)
+        push_stream = speechsdk.audio.PushAudioInputStream(stream_format=fmt)
+        audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
+        recognizer = speechsdk.SpeechRecognizer(speech_config=_get_speech_config(), audio_config=audio_config)
 
-        print("🎧 Transcribing your speech...")
-        result = recognizer.recognize_once()
+        parts = []
+        done = threading.Event()
 
-        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-            print("🗣️ Transcript:", result.text)
-            return result.text
-        elif result.reason == speechsdk.ResultReason.NoMatch:
-            print("⚠️ No speech recognized.")
-        elif result.reason == speechsdk.ResultReason.Canceled:
-            cd = result.cancellation_details
-            print("⚠️ Transcription canceled:", cd.reason)
+        def on_recognized(evt):
+            if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text:
+                parts.append(evt.result.text)
+
+        def on_canceled(evt):
+            cd = evt.cancellation_details
             if cd.reason == speechsdk.CancellationReason.Error:
-                print("Error details:", cd.error_details)
-        return None
+                logger.warning("Transcription canceled: %s (%s)", cd.reason, cd.error_details)
+            done.set()
+
+        recognizer.recognized.connect(on_recognized)
+        recognizer.canceled.connect(on_canceled)
+        recognizer.session_stopped.connect(lambda evt: done.set())
+
+        # recognition runs while we record, so most of the audio is already transcribed at the end
+        recognizer.start_continuous_recognition_async().get()
+        record_audio(push_stream, duration=duration, fs=fs)
+
+        logger.debug("Waiting for final transcription...")
+        done.wait(timeout=15)
+        recognizer.stop_continuous_recognition_async().get()
+
+        if not parts:
+            logger.warning("No speech recognized.")
+            return None
+        text = " ".join(parts)
+        logger.debug("Transcript: %s", text)
+        return text
     except Exception as e:
-        print("❌ Transcription error:", e)
+        logger.error("Transcription error: %s", e)
         return None
 
 
 # ----------------- VALIDATE CUSTOMER -----------------
-def validate_customer_by_phone(phone_input: str):
+def _read_xlsx_rows():
+    # stream the sheet once in read-only mode; a phone lookup doesn't need pandas
+    wb = load_workbook(DATA_PATH, read_only=True, data_only=True)
     try:
-        df = pd.read_excel(DATA_PATH, dtype=str)
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        cols = [str(c).strip().lower() if c is not None else "" for c in header]
+        return [
+            {c: (str(v) if v is not None else None) for c, v in zip(cols, row)}
+            for row in rows
+            if any(v is not None for v in row)
+        ]
+    finally:
+        wb.close()
+
+
+def _read_customer_rows():
+    """
+    Reads customer rows from a Parquet copy of DATA_PATH, (re)building it
+    from the workbook when missing or older than the workbook.
+    """
+    pq_path = os.path.splitext(DATA_PATH)[0] + ".parquet"
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(DATA_PATH):
+        return pq.read_table(pq_path).to_pylist()
+
+    records = _read_xlsx_rows()
+    try:
+        pq.write_table(pa.Table.from_pylist(records), pq_path)
     except Exception as e:
-        print("❌ Failed to read customer file:", e)
-        return None
+        logger.warning("Could not write Parquet cache %s: %s", pq_path, e)
+    return records
 
-    df.columns = [c.strip().lower() for c in df.columns]
-    phone_col = next((c for c in df.columns if "phone" in c), None)
+
+def _load_customers():
+    records = _read_customer_rows()
+    phone_col = next((c for c in (records[0] if records else ()) if "phone" in c), None)
 
     if not phone_col:
-        print("❌ No phone column found in customer data.")
+        logger.error("No phone column found in customer data.")
+        return {}
+
+    by_phone = {}
+    for rec in records:
+        phone = (rec.get(phone_col) or "").translate(_PHONE_TBL)
+        rec[phone_col] = phone
+        # first row wins for duplicate numbers
+        by_phone.setdefault(phone[-10:], rec)
+    return by_phone
+
+
+def _customers_by_phone():
+    mtime = os.path.getmtime(DATA_PATH)
+    if mtime != _CUST_CACHE["mtime"]:
+        with _CUST_LOCK:
+            if mtime != _CUST_CACHE["mtime"]:
+                _CUST_CACHE["by_phone"] = _load_customers()
+                _CUST_CACHE["mtime"] = mtime
+    return _CUST_CACHE["by_phone"]
+
+
+# load once at import so lookups on the call path are dict hits
+try:
+    _customers_by_phone()
+except Exception as e:
+    logger.error("Failed to preload customer file: %s", e)
+
+
+def validate_customer_by_phone(phone_input: str):
+    try:
+        by_phone = _customers_by_phone()
+    except Exception as e:
+        logger.error("Failed to read customer file: %s", e)
         return None
 
-    df[phone_col] = df[phone_col].astype(str).str.replace(r"[\s\-\(\)]", "", regex=True)
-    normalized_input = phone_input.strip().replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+    normalized_input = phone_input.translate(_PHONE_TBL)
 
-    match = df[df[phone_col].str.endswith(normalized_input[-10:])]
-    if match.empty:
-        print("❌ Customer not found.")
+    rec = by_phone.get(normalized_input[-10:])
+    if rec is None:
+        logger.info("Customer not found.")
         return None
 
-    rec = match.iloc[0].to_dict()
-    first = rec.get("first_name") or rec.get("firstname") or ""
-    last = rec.get("last_name") or rec.get("lastname") or ""
-    print(f"✅ Found customer: {first} {last} (id={rec.get('customer_id')})")
-    return rec
+    if logger.isEnabledFor(logging.DEBUG):
+        first = rec.get("first_name") or rec.get("firstname") or ""
+        last = rec.get("last_name") or rec.get("lastname") or ""
+        logger.debug("Found customer: %s %s (id=%s)", first, last, rec.get("customer_id"))
+    return dict(rec)
 
 
 # ----------------- GENERATE GPT REPLY -----------------
 def generate_gpt_reply(transcript: str, customer: dict | None):
+    openai_client = _get_openai_client()
     if openai_client is None:
         return "Assistant unavailable at the moment."
 
@@ -137,39 +249,59 @@ def generate_gpt_reply(transcript: str, customer: dict | None):
         )
         return response.choices[0].message.content.strip()
     except Exception as e:
-        print("❌ GPT error:", e)
+        logger.error("GPT error: %s", e)
         return "Sorry, I couldn't generate a reply."
 
 
 # ----------------- SPEAK RESPONSE -----------------
+# one synthesizer per voice: building one costs a TLS handshake + voice metadata fetch
+_SYNTH_CACHE: dict = {}
+_SYNTH_LOCK = threading.Lock()
+
+
+def _get_synthesizer(voice: str):
+    synthesizer = _SYNTH_CACHE.get(voice)
+    if synthesizer is None:
+        with _SYNTH_LOCK:
+            synthesizer = _SYNTH_CACHE.get(voice)
+            if synthesizer is None:
+                import azure.cognitiveservices.speech as speechsdk
+
+                tts_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
+                tts_config.speech_synthesis_voice_name = voice
+
+                # Explicitly output to default speaker
+                audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
+
+                synthesizer = speechsdk.SpeechSynthesizer(
+                    speech_config=tts_config, audio_config=audio_config
+                )
+                _SYNTH_CACHE[voice] = synthesizer
+    return synthesizer
+
+
 def speak_text(text: str, voice: str = "en-US-AvaMultilingualNeural"):
     """
     Speak text using Azure TTS via AvaMultilingualNeural voice.
     Ensures playback on system default speakers.
     """
-    try:
-        tts_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-        tts_config.speech_synthesis_voice_name = voice
-
-        # Explicitly output to default speaker
-        audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
+    import azure.cognitiveservices.speech as speechsdk
 
-        synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=tts_config, audio_config=audio_config
-        )
+    try:
+        synthesizer = _get_synthesizer(voice)
 
-        print("🔊 Speaking response...")
+        logger.debug("Speaking response...")
         result = synthesizer.speak_text_async(text).get()
 
         if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            print("✅ Speech completed.")
+            logger.debug("Speech completed.")
         elif result.reason == speechsdk.ResultReason.Canceled:
             cd = result.cancellation_details
-            print("⚠️ Speech synthesis canceled:", cd.reason)
+            logger.warning("Speech synthesis canceled: %s", cd.reason)
             if cd.reason == speechsdk.CancellationReason.Error:
-                print("Error details:", cd.error_details)
+                logger.warning("Error details: %s", cd.error_details)
     except Exception as e:
-        print("❌ TTS error:", e)
+        logger.error("TTS error: %s", e)
 
 
 # ----------------- MAIN FLOW -----------------
@@ -178,11 +310,8 @@ def main():
     print("🤖 AI Healthcare Voice Agent — Local Test")
     print("------------------------------------------------------")
 
-    # Record
-    filename = record_audio(duration=10)
-
-    # Transcribe
-    transcript = transcribe_audio(filename)
+    # Record + transcribe (streamed)
+    transcript = transcribe_audio(duration=10)
     if not transcript:
         speak_text("I could not hear you clearly. Please try again.")
         return
@@ -210,4 +339,5 @@ def main():
 
 # ----------------- ENTRY POINT -----------------
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s")
     main()
@@ -6,8 +6,8 @@ import sys
 from flask import Flask, request, jsonify
 
 from azure_asr_tts import AzureSpeechClient
-from customer_data import generate_customers, validate_customer
-from ivr_agent import detect_intent, handle_intent_and_respond
+from customer_data import generate_customers, preload, validate_customer
+from ivr_agent import LOGGER, detect_intent, handle_intent_and_respond
 
 app = Flask(__name__)
 
@@ -20,6 +20,18 @@ speech_client = AzureSpeechClient()
 
 # --- Async handler to simulate a call flow ---
 async def simulate_call_flow():
+    LOGGER.start_new()
+    LOGGER.log("system", "Call started")
+    result = "Call failed."
+    try:
+        result = await _call_flow()
+        return result
+    finally:
+        LOGGER.log("system", result)
+        LOGGER.close()  # end of call: release the conversation log file
+
+
+async def _call_flow():
     await speech_client.speak("Incoming call. Connecting now.")
     user = await authenticate_user()
     if not user:
@@ -35,7 +47,11 @@ async def simulate_call_flow():
 
 # --- Authentication loop ---
 async def authenticate_user():
-    await speech_client.speak("Please say your registered phone number.")
+    # build the customer index while the first prompt is playing
+    await asyncio.gather(
+        speech_client.speak("Please say your registered phone number."),
+        asyncio.to_thread(preload),
+    )
     phone = await speech_client.listen_once()
 
     await speech_client.speak("Say the last four digits of your SSN.")
@@ -44,7 +60,7 @@ async def authenticate_user():
     await speech_client.speak("Say your date of birth in MM slash DD slash YYYY format.")
     dob = await speech_client.listen_once()
 
-    user = validate_customer(phone, ssn, dob)
+    user = await asyncio.to_thread(validate_customer, phone, ssn, dob)
     if user:
         await speech_client.speak(f"Welcome {user.get('first_name', '')}.")
         return user
@@ -1,11 +1,50 @@
+import os
 import time
 import logging
+import functools
 from pathlib import Path
-from .helpers import debug_dump
+import jwt
+import orjson
+import requests
+from .helpers import debug_dump, safe_env
 
 logger = logging.getLogger("auth_server")
 logger.setLevel(logging.INFO)
 
+EPIC_OIDC_CONFIG = "https://fhir.epic.com/interconnect-fhir-oauth/oauth2/.well-known/openid-configuration"
+JWKS_TTL = 3600
+DISCOVERY_RETRY = 60  # seconds to wait before retrying a failed OIDC discovery
+
+_discovery_failed = {}  # oidc_config_url -> monotonic time discovery may be retried
+
+
+@functools.lru_cache(maxsize=4)
+def _discover_jwks_client(oidc_config_url: str):
+    resp = requests.get(oidc_config_url, timeout=10)
+    resp.raise_for_status()
+    return jwt.PyJWKClient(resp.json()["jwks_uri"], cache_jwk_set=True, lifespan=JWKS_TTL)
+
+
+def _jwks_client(oidc_config_url: str):
+    """
+    One JWKS client per issuer. Keys are cached for JWKS_TTL and re-fetched
+    early only when a token carries an unknown kid (key rotation).
+    A failed discovery is remembered for DISCOVERY_RETRY seconds so an IdP
+    outage doesn't cost every verification a 10s request.
+    """
+    retry_at = _discovery_failed.get(oidc_config_url)
+    if retry_at is not None and time.monotonic() < retry_at:
+        raise RuntimeError(f"OIDC discovery failed recently for {oidc_config_url}")
+
+    try:
+        client = _discover_jwks_client(oidc_config_url)
+    except Exception:
+        _discovery_failed[oidc_config_url] = time.monotonic() + DISCOVERY_RETRY
+        raise
+
+    _discovery_failed.pop(oidc_config_url, None)
+    return client
+
 
 class AuthTokenCache:
     """
@@ -14,11 +53,16 @@ class AuthTokenCache:
     ✅ Stores Epic OAuth access_token + refresh_token
     ✅ Persists to disk (auth_token.json)
     ✅ Auto-expiration handling
+    ✅ Offline JWT signature / exp / aud check (cached JWKS)
     """
 
-    def __init__(self, path: Path = Path("data/auth_token.json")):
+    def __init__(self, path: Path = Path("data/auth_token.json"), audience: str = None):
         self.path = path
         self.token = None
+        self.audience = audience or safe_env("EPIC_FHIR_AUDIENCE")
+        self.oidc_config = safe_env("EPIC_OIDC_CONFIG", EPIC_OIDC_CONFIG)
+        self._verified = None  # access_token that already passed verification
+        self._saved = None  # last bytes written/read, to skip identical rewrites
         self._load()
 
     # ------------------------------------------------------------
@@ -29,11 +73,9 @@ class AuthTokenCache:
             return
 
         try:
-            import json
-
-            with open(self.path, "r") as f:
-                self.token = json.load(f)
-                logger.info(f"Loaded cached Epic token from {self.path}")
+            self._saved = self.path.read_bytes()
+            self.token = orjson.loads(self._saved)
+            logger.info(f"Loaded cached Epic token from {self.path}")
 
         except Exception as e:
             logger.error(f"Failed loading token cache: {e}")
@@ -43,11 +85,16 @@ class AuthTokenCache:
     # ------------------------------------------------------------
     def _save(self):
         try:
-            import json
+            blob = orjson.dumps(self.token, option=orjson.OPT_INDENT_2)
+            if blob == self._saved:
+                return
 
+            # write-then-rename so a crash never leaves a half-written token file
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.path, "w") as f:
-                json.dump(self.token, f, indent=2)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, self.path)
+            self._saved = blob
         except Exception as e:
             logger.error(f"Failed saving token cache: {e}")
 
@@ -79,7 +126,40 @@ class AuthTokenCache:
             logger.info("Cached Epic token expired.")
             return None
 
-        return self.token["access_token"]
+        access_token = self.token["access_token"]
+        if access_token != self._verified and not self._verify(access_token):
+            return None
+
+        return access_token
+
+    # ------------------------------------------------------------
+    # Local JWT verification (no introspection round-trip)
+    # ------------------------------------------------------------
+    def _verify(self, access_token: str):
+        """
+        Offline signature / exp / aud check of a JWT access token.
+        Fails closed: if the JWKS can't be fetched (discovery down or backing off),
+        the token is treated as invalid and the caller refreshes instead.
+        """
+        # opaque (non-JWT) tokens can't be checked offline; expiry check above applies
+        if access_token.count(".") != 2:
+            return True
+
+        try:
+            key = _jwks_client(self.oidc_config).get_signing_key_from_jwt(access_token).key
+            jwt.decode(
+                access_token,
+                key=key,
+                algorithms=["RS256"],
+                audience=self.audience,
+                options={"verify_aud": bool(self.audience)},
+            )
+        except Exception as e:
+            logger.warning(f"Cached Epic token failed verification: {e}")
+            return False
+
+        self._verified = access_token
+        return True
 
     # ------------------------------------------------------------
     # Retrieve refresh_token
@@ -1,14 +1,39 @@
 import os
 import asyncio
 import logging
+import sys
 import base64
+import queue
+import random
+import threading
+import time
+import wave
+from array import array
 from pathlib import Path
 import uuid
-import requests
+from xml.sax.saxutils import escape, quoteattr
+import httpx
+import azure.cognitiveservices.speech as speechsdk
 
 logger = logging.getLogger("azure_speech")
 logger.setLevel(logging.INFO)
 
+TTS_PREWARM = int(os.getenv("AZURE_TTS_PREWARM", "3"))
+TTS_POOL_TTL = 300       # seconds a pooled synthesizer connection is reused (jittered ±20%)
+TTS_CHUNK_BYTES = 16000  # read size from the synthesis stream
+
+ASR_CHUNK_FRAMES = 2048      # 4 KB of 16-bit mono PCM per push
+ASR_UPLOAD_CHUNK = 16384     # bytes per chunk for REST uploads
+ASR_RESULT_TIMEOUT = 10      # seconds allowed beyond the turn's audio duration
+ASR_THROTTLE_BACKOFF = 1.0   # pause before rebuilding a canceled (e.g. throttled) session
+ASR_SEGMENT_SILENCE_MS = 500 # silence that ends a phrase (segmentation timeout)
+ASR_VOICE_LEVEL = 500        # 16-bit peak above which a chunk counts as voiced
+_ASR_BYTES_PER_SEC = 32000   # 16 kHz * 16-bit mono
+_ASR_SEGMENT_BYTES = ASR_SEGMENT_SILENCE_MS * _ASR_BYTES_PER_SEC // 1000
+_ASR_SILENCE = bytes(_ASR_BYTES_PER_SEC)  # 1s pad: longer than the segmentation timeout
+_TICKS_PER_SEC = 10_000_000  # SDK offsets/durations are in 100 ns ticks
+_ASR_CANCELED = object()     # queued when the session is canceled with an error
+
 
 class AzureSpeechClient:
     """
@@ -26,15 +51,137 @@ class AzureSpeechClient:
             raise ValueError("AZURE_SPEECH_KEY missing in .env")
 
         self.asr_url = f"https://{self.region}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1"
-        self.tts_url = f"https://{self.region}.tts.speech.microsoft.com/cognitiveservices/v1"
+
+        # TTS goes through the Speech SDK websocket so audio streams as it's synthesized
+        self._tts_config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.region)
+        self._tts_config.speech_synthesis_voice_name = self.voice
+        self._ssml_prefix = (
+            f"<speak version='1.0' xml:lang='en-US'><voice name={quoteattr(self.voice)}>"
+        )
+        self._tts_config.set_speech_synthesis_output_format(
+            speechsdk.SpeechSynthesisOutputFormat.Audio48Khz192KBitRateMonoMp3
+        )
+        self.num_prewarm = TTS_PREWARM
+        self._tts_pool = queue.SimpleQueue()
+        # warm the pool off the constructor; checkout builds on demand until it fills
+        threading.Thread(target=self._prewarm_tts, name="tts-prewarm", daemon=True).start()
+
+        # One continuous-recognition session per client, fed turn by turn through a push
+        # stream; phrase segmentation (not session teardown) marks where a turn ends.
+        # Session and semaphore are created on first use, bound to the loop running transcribe()
+        self._asr_config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.region)
+        self._asr_config.speech_recognition_language = "en-US"
+        self._asr_config.set_property(
+            speechsdk.PropertyId.Speech_SegmentationSilenceTimeoutMs, str(ASR_SEGMENT_SILENCE_MS)
+        )
+        self._asr_stream = None
+        self._recognizer = None
+        self._asr_results = None
+        self._asr_loop = None
+        self._asr_pushed = 0  # bytes written to the session's stream so far
+        self._asr_throttle = None
+        self._asr_throttle_loop = None
+
+        # One pooled HTTP/2 client for REST ASR (non-PCM input): TLS is paid once, not per call
+        self._client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=30,
+            headers={"Ocp-Apim-Subscription-Key": self.speech_key},
+        )
+
+    async def close(self):
+        """Close the pooled HTTP client, the recognition session and the pre-warmed TTS connections."""
+        await self._client.aclose()
+        await asyncio.to_thread(self._stop_recognizer)
+        while True:
+            try:
+                self._tts_pool.get_nowait()[1].close()
+            except queue.Empty:
+                break
+
+    # ------------------------------------------------------------------
+    # TTS synthesizer pool
+    # ------------------------------------------------------------------
+    def _new_synthesizer(self):
+        """
+        Builds a synthesizer with its websocket already open.
+        Expiry is jittered so pooled connections don't all reconnect together.
+        """
+        synth = speechsdk.SpeechSynthesizer(speech_config=self._tts_config, audio_config=None)
+        conn = speechsdk.Connection.from_speech_synthesizer(synth)
+        conn.open(True)
+        expires_at = time.monotonic() + TTS_POOL_TTL * random.uniform(0.8, 1.2)
+        return synth, conn, expires_at
+
+    def _prewarm_tts(self):
+        for _ in range(self.num_prewarm):
+            try:
+                self._tts_pool.put(self._new_synthesizer())
+            except Exception as e:
+                logger.warning(f"TTS prewarm failed, synthesizers will be built on demand: {e}")
+                return
+
+    def _checkout_synthesizer(self):
+        try:
+            entry = self._tts_pool.get_nowait()
+        except queue.Empty:
+            return self._new_synthesizer()
+        if entry[2] < time.monotonic():
+            entry[1].close()
+            return self._new_synthesizer()
+        return entry
+
+    def _checkin_synthesizer(self, entry):
+        if self._tts_pool.qsize() < self.num_prewarm:
+            self._tts_pool.put(entry)
+        else:
+            entry[1].close()
 
     # ------------------------------------------------------------------
     # TEXT → SPEECH (TTS)
     # ------------------------------------------------------------------
+    async def speak_stream(self, text: str):
+        """
+        Streams text → speech as MP3 chunks while Azure is still synthesizing.
+        Callers can play chunks directly; closing the generator early stops synthesis.
+        """
+        xml_body = self._ssml_prefix + escape(text) + "</voice></speak>"
+
+        entry = await asyncio.to_thread(self._checkout_synthesizer)
+        synth = entry[0]
+        finished = healthy = False
+        try:
+            result = await asyncio.to_thread(lambda: synth.start_speaking_ssml_async(xml_body).get())
+            stream = speechsdk.AudioDataStream(result)
+            buf = bytes(TTS_CHUNK_BYTES)
+            while True:
+                n = await asyncio.to_thread(stream.read_data, buf)
+                if n == 0:
+                    break
+                yield buf[:n]
+            finished = True
+
+            if stream.status == speechsdk.StreamStatus.Canceled:
+                cd = stream.cancellation_details
+                logger.error(f"TTS error: {cd.reason} {cd.error_details}")
+            else:
+                healthy = True
+        finally:
+            # only a cleanly finished synthesizer goes back to the pool
+            if healthy:
+                self._checkin_synthesizer(entry)
+            else:
+                try:
+                    if not finished:
+                        await asyncio.to_thread(lambda: synth.stop_speaking_async().get())
+                finally:
+                    entry[1].close()
+
     async def speak(self, text: str, out_path: str = None) -> str:
         """
         Converts text → speech (MP3).
-        Returns the path of the MP3 file.
+        Returns the path of the MP3 file once the stream completes.
         """
 
         if not text:
@@ -46,47 +193,189 @@ class AzureSpeechClient:
             out_path = f"data/audio/tts_{uuid.uuid4().hex}.mp3"
         Path(out_path).parent.mkdir(parents=True, exist_ok=True)
 
-        xml_body = f"""
-            <speak version='1.0' xml:lang='en-US'>
-                <voice name='{self.voice}'>{text}</voice>
-            </speak>
-        """
-
-        headers = {
-            "Content-Type": "application/ssml+xml",
-            "X-Microsoft-OutputFormat": "audio-48khz-192kbitrate-mono-mp3",
-            "Ocp-Apim-Subscription-Key": self.speech_key,
-        }
+        size = 0
+        with open(out_path, "wb") as f:
+            async for chunk in self.speak_stream(text):
+                f.write(chunk)
+                size += len(chunk)
 
-        r = requests.post(self.tts_url, data=xml_body.encode("utf-8"), headers=headers)
-        if r.status_code != 200:
-            logger.error(f"TTS error: {r.status_code} {r.text}")
+        if not size:
+            Path(out_path).unlink(missing_ok=True)
             return None
 
-        with open(out_path, "wb") as f:
-            f.write(r.content)
-
         return out_path
 
     # ------------------------------------------------------------------
     # SPEECH → TEXT (STT)
     # ------------------------------------------------------------------
+    def _start_recognizer(self, loop):
+        """
+        Opens the continuous-recognition session fed by a push stream.
+        Every final result (speech or no-match) is queued as (end_byte, text), where
+        end_byte is the phrase end as a byte position in the stream; that position is
+        what transcribe() uses to tell when a turn's last phrase has come back.
+        """
+        stream = speechsdk.audio.PushAudioInputStream()
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self._asr_config,
+            audio_config=speechsdk.audio.AudioConfig(stream=stream),
+        )
+        results = asyncio.Queue()
+
+        def on_recognized(evt):
+            r = evt.result
+            end = (r.offset + r.duration) * _ASR_BYTES_PER_SEC // _TICKS_PER_SEC
+            text = r.text if r.reason == speechsdk.ResultReason.RecognizedSpeech else ""
+            loop.call_soon_threadsafe(results.put_nowait, (end, text))
+
+        def on_canceled(evt):
+            cd = evt.cancellation_details
+            logger.error(f"ASR session canceled: {cd.reason} {cd.error_details}")
+            loop.call_soon_threadsafe(results.put_nowait, _ASR_CANCELED)
+
+        recognizer.recognized.connect(on_recognized)
+        recognizer.canceled.connect(on_canceled)
+        recognizer.start_continuous_recognition_async().get()
+        self._asr_stream, self._recognizer, self._asr_results = stream, recognizer, results
+        self._asr_loop = loop
+        self._asr_pushed = 0
+
+    def _stop_recognizer(self):
+        if self._recognizer is None:
+            return
+        self._asr_stream.close()
+        try:
+            self._recognizer.stop_continuous_recognition_async().get()
+        finally:
+            self._asr_stream = self._recognizer = self._asr_results = self._asr_loop = None
+
+    @staticmethod
+    def _open_wav(audio_path: str):
+        """Opens a 16 kHz / 16-bit / mono WAV; None if it's any other format or unreadable."""
+        try:
+            w = wave.open(audio_path, "rb")
+        except (wave.Error, EOFError) as e:
+            logger.warning(f"ASR WAV unreadable, falling back to REST: {e}")
+            return None
+        if (w.getframerate(), w.getsampwidth(), w.getnchannels()) != (16000, 2, 1):
+            w.close()
+            return None
+        return w
+
+    def _push_wav(self, w):
+        """
+        Feeds the WAV into the live session in 4 KB chunks, then a silence pad so the
+        last phrase is segmented. Returns (start, voiced_end, end) byte positions of the
+        turn in the session stream, or None if the file breaks off mid-read.
+        """
+        start = pos = voiced_end = self._asr_pushed
+        try:
+            while True:
+                frames = w.readframes(ASR_CHUNK_FRAMES)
+                if not frames:
+                    break
+                self._asr_stream.write(frames)
+                pos += len(frames)
+                samples = array("h", frames)
+                if sys.byteorder == "big":
+                    samples.byteswap()
+                if max(samples) > ASR_VOICE_LEVEL or -min(samples) > ASR_VOICE_LEVEL:
+                    voiced_end = pos
+            self._asr_stream.write(_ASR_SILENCE)
+            pos += len(_ASR_SILENCE)
+        except (wave.Error, EOFError) as e:
+            logger.warning(f"ASR WAV truncated, falling back to REST: {e}")
+            return None
+        finally:
+            w.close()
+            self._asr_pushed = pos
+        return start, voiced_end, pos
+
+    def _turn_lock(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._asr_throttle_loop is not loop:
+            self._asr_throttle = asyncio.Semaphore(1)
+            self._asr_throttle_loop = loop
+        return self._asr_throttle
+
     async def transcribe(self, audio_path: str) -> str:
         """
         Transcribes an audio file (wav, mp3).
+        16 kHz mono PCM WAV goes through the client's continuous-recognition session;
+        the turn ends once a phrase comes back reaching the file's last voiced audio
+        (a later phrase would need a segmentation-length silence after it).
+        Anything else falls back to the REST endpoint.
         """
 
         if not Path(audio_path).exists():
             logger.error(f"ASR input missing: {audio_path}")
             return ""
 
+        if not audio_path.endswith(".wav"):
+            return await self._transcribe_rest(audio_path)
+
+        # one turn at a time on the shared session; also throttles us after a 429-style cancel
+        async with self._turn_lock():
+            wav = await asyncio.to_thread(self._open_wav, audio_path)
+            if wav is None:
+                return await self._transcribe_rest(audio_path)
+
+            loop = asyncio.get_running_loop()
+            try:
+                if self._recognizer is not None and self._asr_loop is not loop:
+                    await asyncio.to_thread(self._stop_recognizer)
+                if self._recognizer is None:
+                    await asyncio.to_thread(self._start_recognizer, loop)
+            except BaseException:
+                wav.close()
+                raise
+
+            results = self._asr_results
+            while not results.empty():
+                results.get_nowait()
+
+            marks = await asyncio.to_thread(self._push_wav, wav)
+            if marks is None:
+                return await self._transcribe_rest(audio_path)
+            start, voiced_end, end = marks
+            if voiced_end == start:
+                return ""
+
+            parts = []
+            try:
+                # the session may lag by up to the audio's length, so the budget scales with it
+                async with asyncio.timeout(ASR_RESULT_TIMEOUT + (end - start) / _ASR_BYTES_PER_SEC):
+                    while True:
+                        item = await results.get()
+                        if item is _ASR_CANCELED:
+                            # rebuild the session on the next turn, after a short backoff
+                            await asyncio.to_thread(self._stop_recognizer)
+                            await asyncio.sleep(ASR_THROTTLE_BACKOFF)
+                            break
+                        phrase_end, text = item
+                        if phrase_end <= start:
+                            continue  # late result from an earlier turn
+                        if text:
+                            parts.append(text)
+                        if phrase_end >= voiced_end - _ASR_SEGMENT_BYTES:
+                            break
+            except TimeoutError:
+                logger.warning("ASR turn timed out; returning partial transcript")
+
+            return " ".join(parts)
+
+    async def _transcribe_rest(self, audio_path: str) -> str:
         headers = {
-            "Ocp-Apim-Subscription-Key": self.speech_key,
             "Content-Type": "audio/wav" if audio_path.endswith(".wav") else "audio/mpeg",
         }
 
-        with open(audio_path, "rb") as audio:
-            r = requests.post(self.asr_url, data=audio, headers=headers)
+        async def audio_chunks():
+            # chunked upload: O(16 KB) memory, disk reads overlap the network send
+            with open(audio_path, "rb") as f:
+                while chunk := await asyncio.to_thread(f.read, ASR_UPLOAD_CHUNK):
+                    yield chunk
+
+        r = await self._client.post(self.asr_url, content=audio_chunks(), headers=headers)
 
         if r.status_code != 200:
             logger.error(f"ASR error: {r.status_code} {r.text}")
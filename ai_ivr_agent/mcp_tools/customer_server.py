@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import re
 import logging
+import functools
 from .helpers import debug_dump
 
 logger = logging.getLogger("customer_server")
@@ -9,6 +11,64 @@ logger.setLevel(logging.INFO)
 
 DATA_PATH = Path("data/customers.xlsx")
 
+# Deletes every non-digit in Latin-1; no regex engine on the per-call path
+_DIGIT_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdecimal()))
+_NON_DIGIT = re.compile(r"\D")
+
+
+def _only_digits(text: str):
+    out = text.translate(_DIGIT_TABLE)
+    # characters beyond Latin-1 pass through the table; let the regex strip those
+    return out if out.isascii() else _NON_DIGIT.sub("", out)
+
+
+def _phone_norm_array(phones):
+    """Last 10 digits of each phone as a compact fixed-width <U10 array."""
+    return np.array([_only_digits(str(p))[-10:] for p in phones], dtype="<U10")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_frame(data_path: Path, mtime: float):
+    """
+    Shared, memoized customer DataFrame (keyed by path + mtime so edits reload).
+    Reads a Parquet copy next to the workbook when it's at least as new;
+    otherwise parses the xlsx once and writes that copy.
+    """
+    pq_path = data_path.with_suffix(".parquet")
+    if pq_path.exists() and pq_path.stat().st_mtime >= mtime:
+        # copies written by customer_data.py carry a phone_norm column; the array below replaces it
+        return pd.read_parquet(pq_path).drop(columns="phone_norm", errors="ignore")
+
+    df = pd.read_excel(data_path, dtype=str, engine="openpyxl")
+    try:
+        df.to_parquet(pq_path, index=False, compression="zstd")
+    except Exception as e:
+        logger.warning(f"Could not write Parquet cache {pq_path}: {e}")
+    return df
+
+
+@functools.lru_cache(maxsize=4)
+def _load_phone_norm(data_path: Path, mtime: float):
+    """
+    Normalized phones as a numpy <U10 array, memoized next to the frame
+    rather than stored as an object column in it (no per-row Python strings).
+    Only the build_index=False mask lookup loads this; the dict index never does.
+    """
+    return _phone_norm_array(_load_frame(data_path, mtime)["phone"].to_numpy(dtype=object))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_index(data_path: Path, mtime: float):
+    """
+    (phone_norm, last4ssn, dob) -> customer row, built once per loaded frame.
+    First row wins for duplicate keys, as with the old mask + iloc[0].
+    """
+    index = {}
+    for rec in _load_frame(data_path, mtime).to_dict("records"):
+        # dict keys need Python str anyway, so normalize straight from the record
+        index.setdefault((_only_digits(str(rec["phone"]))[-10:], rec["last4ssn"], rec["dob"]), rec)
+    return index
+
 
 class CustomerDataService:
     """
@@ -20,9 +80,16 @@ class CustomerDataService:
     ✅ Returns matching customer dict
     """
 
-    def __init__(self, data_path: Path = DATA_PATH):
+    def __init__(self, data_path: Path = DATA_PATH, build_index: bool = True):
+        """
+        build_index=False skips the dict index (less memory) and looks
+        customers up with a vectorized numpy equality mask instead.
+        """
         self.data_path = data_path
+        self.build_index = build_index
         self.data = None
+        self._index = {}
+        self._phone_norm = None
         self._load_data()
 
     # ------------------------------------------------------------
@@ -32,17 +99,19 @@ class CustomerDataService:
         if not self.data_path.exists():
             logger.warning(f"Customer data file missing at: {self.data_path}")
             self.data = None
+            self._index = {}
+            self._phone_norm = None
             return
 
-        self.data = pd.read_excel(self.data_path, dtype=str)
-
-        # Normalize phone into a separate column
-        self.data["phone_norm"] = (
-            self.data["phone"]
-            .astype(str)
-            .str.replace(r"\D", "", regex=True)
-            .str[-10:]
-        )
+        mtime = self.data_path.stat().st_mtime
+        self.data = _load_frame(self.data_path, mtime)
+        if self.build_index:
+            self._index = _load_index(self.data_path, mtime)
+            self._phone_norm = None
+        else:
+            # only the mask fallback needs the phone array
+            self._index = None
+            self._phone_norm = _load_phone_norm(self.data_path, mtime)
 
         logger.info(f"Loaded {len(self.data)} customers from {self.data_path}")
 
@@ -53,7 +122,7 @@ class CustomerDataService:
     def normalize_digits(text: str):
         if not text:
             return ""
-        return re.sub(r"\D", "", text or "")
+        return _only_digits(text)
 
     # ------------------------------------------------------------
     # Optional DOB formatter: if user speaks digits → convert to mm/dd/yyyy
@@ -64,7 +133,7 @@ class CustomerDataService:
             return ""
 
         text = text.strip()
-        only_digits = re.sub(r"\D", "", text)
+        only_digits = _only_digits(text)
 
         # If exactly 8 digits → mmddyyyy → mm/dd/yyyy
         if len(only_digits) == 8:
@@ -95,18 +164,33 @@ class CustomerDataService:
             tag="CUSTOMER_LOOKUP_INPUTS",
         )
 
-        match = self.data[
-            (self.data["phone_norm"].str.endswith(phone_digits))
-            & (self.data["last4ssn"] == last4_digits)
-            & (self.data["dob"] == dob_norm)
-        ]
+        if self._index is not None:
+            match = self._index.get((phone_digits, last4_digits, dob_norm))
+        else:
+            match = self._mask_lookup(phone_digits, last4_digits, dob_norm)
 
-        if match.empty:
+        if match is None:
             logger.info("No matching customer found.")
             return None
 
-        customer = match.iloc[0].to_dict()
+        customer = dict(match)
 
         debug_dump(customer, "CUSTOMER_LOOKUP_MATCH")
 
         return customer
+
+    # ------------------------------------------------------------
+    # Fallback lookup without the dict index
+    # ------------------------------------------------------------
+    def _mask_lookup(self, phone_digits: str, last4_digits: str, dob_norm: str):
+        # phone_norm is already the last-10 tail, so equality == the old endswith;
+        # comparing raw numpy arrays skips pandas' per-call Series overhead
+        mask = (
+            (self._phone_norm == phone_digits)
+            & (self.data["last4ssn"].to_numpy() == last4_digits)
+            & (self.data["dob"].to_numpy() == dob_norm)
+        )
+        hits = np.flatnonzero(mask)
+        if not hits.size:
+            return None
+        return self.data.iloc[hits[0]].to_dict()
@@ -1,6 +1,7 @@
 import os
 import logging
 import smtplib
+import threading
 from email.message import EmailMessage
 
 logger = logging.getLogger("email_server")
@@ -25,6 +26,40 @@ class EmailServer:
         if not self.username or not self.password:
             raise ValueError("Missing EMAIL_HOST_USER or EMAIL_HOST_PASSWORD in .env")
 
+        # One logged-in SMTP session, reused across sends
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------------
+    # Connection handling
+    # -----------------------------------------------------------
+    def _get_conn(self):
+        if self._conn is not None:
+            try:
+                self._conn.noop()
+                return self._conn
+            except smtplib.SMTPException:
+                # idle session was dropped by the server -> reconnect
+                self._reset_conn()
+
+        conn = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        conn.starttls()
+        conn.login(self.username, self.password)
+        self._conn = conn
+        return conn
+
+    def _reset_conn(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                pass
+            self._conn = None
+
+    def close(self):
+        with self._lock:
+            self._reset_conn()
+
     # -----------------------------------------------------------
     # Generic send email
     # -----------------------------------------------------------
@@ -39,10 +74,12 @@ class EmailServer:
             msg.add_alternative(html_body, subtype="html")
 
         try:
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
+            with self._lock:
+                try:
+                    self._get_conn().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    self._reset_conn()
+                    self._get_conn().send_message(msg)
 
             logger.info(f"✅ Email sent to {to_email}")
 
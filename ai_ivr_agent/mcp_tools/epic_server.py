@@ -1,9 +1,11 @@
-import os
 import json
 import base64
 import hashlib
+import secrets
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlencode
 from .helpers import safe_env, debug_dump
 
@@ -60,6 +62,25 @@ class EpicOAuthPKCE:
         if not self.client_id or not self.redirect_uri:
             raise Exception("Missing EPIC_CLIENT_ID or EPIC_REDIRECT_URI in environment")
 
+        # Only code_challenge varies per authorize URL; encode the rest once
+        self._static_auth_qs = urlencode({
+            "client_id": self.client_id,
+            "redirect_uri": self.redirect_uri,
+            "response_type": "code",
+            "scope": self.scope,
+            "code_challenge_method": "S256",
+            "aud": self.audience,   # ✅ CRITICAL FIX
+        })
+
+        # Pooled keep-alive session: token + FHIR calls skip the TLS handshake after the first
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        )
+        self.session.mount("https://", adapter)
+
         logger.info(f"✅ Epic OAuth PKCE initialized for Client ID: {self.client_id}")
 
     # ------------------------------------------------------------
@@ -67,10 +88,12 @@ class EpicOAuthPKCE:
     # ------------------------------------------------------------
     @staticmethod
     def generate_pkce_pair():
-        verifier = base64.urlsafe_b64encode(os.urandom(32)).rstrip(b"=").decode("utf-8")
+        # token_urlsafe = urandom + unpadded base64url in one call (43 chars for 32 bytes)
+        verifier = secrets.token_urlsafe(32)
+        # S256 is defined over the ASCII verifier, so it can't hash the raw bytes
         challenge = base64.urlsafe_b64encode(
-            hashlib.sha256(verifier.encode("utf-8")).digest()
-        ).rstrip(b"=").decode("utf-8")
+            hashlib.sha256(verifier.encode("ascii")).digest()
+        ).rstrip(b"=").decode("ascii")
 
         return verifier, challenge
 
@@ -84,17 +107,8 @@ class EpicOAuthPKCE:
 
         code_verifier, code_challenge = self.generate_pkce_pair()
 
-        params = {
-            "client_id": self.client_id,
-            "redirect_uri": self.redirect_uri,
-            "response_type": "code",
-            "scope": self.scope,
-            "code_challenge": code_challenge,
-            "code_challenge_method": "S256",
-            "aud": self.audience,   # ✅ CRITICAL FIX
-        }
-
-        url = f"{self.auth_url}?{urlencode(params)}"
+        # challenge is base64url -> already query-safe
+        url = f"{self.auth_url}?{self._static_auth_qs}&code_challenge={code_challenge}"
 
         logger.info(f"✅ Generated EPIC Authorization URL:\n{url}")
 
@@ -121,7 +135,7 @@ class EpicOAuthPKCE:
 
         logger.info("🔄 Sending Epic token request...")
 
-        resp = requests.post(self.token_url, data=payload, timeout=30)
+        resp = self.session.post(self.token_url, data=payload, timeout=30)
 
         if resp.status_code != 200:
             logger.error(f"❌ Epic token request failed: {resp.text}")
@@ -151,7 +165,7 @@ class EpicOAuthPKCE:
 
         logger.info(f"➡️ Epic GET: {url}")
 
-        resp = requests.get(url, headers=headers, timeout=30)
+        resp = self.session.get(url, headers=headers, timeout=30)
 
         if resp.status_code not in (200, 201):
             logger.error(f"❌ FHIR GET failed: {resp.status_code} {resp.text}")
@@ -176,10 +190,15 @@ class EpicOAuthPKCE:
 
         logger.info(f"➡️ Epic POST: {url}")
 
-        resp = requests.post(url, headers=headers, json=json_body, timeout=30)
+        resp = self.session.post(url, headers=headers, json=json_body, timeout=30)
 
         if resp.status_code not in (200, 201):
             logger.error(f"❌ FHIR POST failed: {resp.status_code} {resp.text}")
             raise Exception(f"Epic POST error {resp.status_code}: {resp.text}")
 
         return resp.json()
+
+    def __del__(self):
+        session = getattr(self, "session", None)
+        if session is not None:
+            session.close()
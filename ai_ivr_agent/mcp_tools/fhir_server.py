@@ -1,10 +1,24 @@
 import logging
+import hashlib
+import re
+import threading
+from cachetools import TTLCache
 from .helpers import debug_dump
 from .epic_server import EpicOAuthPKCE
 
 logger = logging.getLogger("fhir_server")
 logger.setLevel(logging.INFO)
 
+# Short-lived cache for read-only GETs that rarely change within one IVR call.
+# Keyed by (endpoint, token fingerprint) so one patient's data never serves another token.
+_GET_CACHE = TTLCache(maxsize=1024, ttl=60)
+_GET_CACHE_LOCK = threading.Lock()
+_CACHEABLE = re.compile(r"^(?:Slot\?|(?:Patient|Practitioner)/[^/?]+$)")
+
+
+def _cache_key(endpoint: str, access_token: str):
+    return endpoint, hashlib.sha256(access_token.encode()).digest()[:8]
+
 
 class FHIRService:
     """
@@ -32,7 +46,7 @@ class FHIRService:
 
         logger.info(f"Searching slots for provider {provider_id}")
 
-        result = self.epic.fhir_get(endpoint, access_token)
+        result = self.fhir_get(endpoint, access_token)
 
         debug_dump(result, "FHIR_SLOT_SEARCH")
 
@@ -50,7 +64,7 @@ class FHIRService:
 
         logger.info(f"Fetching Patient {patient_id}")
 
-        result = self.epic.fhir_get(endpoint, access_token)
+        result = self.fhir_get(endpoint, access_token)
 
         debug_dump(result, "FHIR_GET_PATIENT")
 
@@ -95,15 +109,103 @@ class FHIRService:
 
         result = self.epic.fhir_post("Appointment", access_token, appointment_body)
 
+        # the booked slot is no longer free
+        self.invalidate("Slot")
+
         debug_dump(result, "FHIR_APPOINTMENT_RESPONSE")
 
         return result
 
+    # ------------------------------------------------------------
+    # Several GETs in one round-trip (FHIR batch Bundle)
+    # ------------------------------------------------------------
+    def fhir_batch(self, endpoints: list, access_token: str):
+        """
+        POST [base] Bundle{type: batch} with one GET entry per endpoint.
+        Returns the resources in request order (None for entries that failed).
+        Successful cacheable reads also prime the GET cache.
+        """
+
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "batch",
+            "entry": [{"request": {"method": "GET", "url": ep}} for ep in endpoints]
+        }
+
+        logger.info(f"FHIR batch GET x{len(endpoints)}")
+
+        # batch/transaction Bundles POST to the service base itself, with no trailing slash
+        url = self.epic.epic_base_url.rstrip("/")
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/fhir+json",
+            "Accept": "application/fhir+json",
+        }
+
+        resp = self.epic.session.post(url, headers=headers, json=bundle, timeout=30)
+
+        if resp.status_code not in (200, 201):
+            logger.error(f"FHIR batch failed: {resp.status_code} {resp.text}")
+            raise Exception(f"Epic batch error {resp.status_code}: {resp.text}")
+
+        result = resp.json()
+
+        # pad so callers can always unpack one result per endpoint
+        entries = result.get("entry", [])
+        entries += [{}] * (len(endpoints) - len(entries))
+
+        resources = []
+        for ep, entry in zip(endpoints, entries):
+            status = (entry.get("response") or {}).get("status", "")
+            resource = entry.get("resource") if status.startswith("2") else None
+            resources.append(resource)
+            if resource is not None and _CACHEABLE.match(ep):
+                with _GET_CACHE_LOCK:
+                    _GET_CACHE[_cache_key(ep, access_token)] = resource
+
+        debug_dump(result, "FHIR_BATCH_RESPONSE")
+
+        return resources
+
+    def get_booking_context(self, access_token: str, patient_id: str, slot_id: str, provider_id: str):
+        """
+        Patient, Slot and Practitioner for a booking in a single batch request
+        instead of three sequential GETs.
+        """
+        patient, slot, practitioner = self.fhir_batch(
+            [f"Patient/{patient_id}", f"Slot/{slot_id}", f"Practitioner/{provider_id}"],
+            access_token,
+        )
+        return {"patient": patient, "slot": slot, "practitioner": practitioner}
+
     # ------------------------------------------------------------
     # Generic FHIR delegations
     # ------------------------------------------------------------
     def fhir_get(self, endpoint: str, access_token: str):
-        return self.epic.fhir_get(endpoint, access_token)
+        """
+        GET with a 60s TTL cache for whitelisted read-only endpoints
+        (Slot searches, Patient/{id}, Practitioner/{id}); everything else bypasses it.
+        """
+        if not _CACHEABLE.match(endpoint):
+            return self.epic.fhir_get(endpoint, access_token)
+
+        key = _cache_key(endpoint, access_token)
+        with _GET_CACHE_LOCK:
+            cached = _GET_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.epic.fhir_get(endpoint, access_token)
+        with _GET_CACHE_LOCK:
+            _GET_CACHE[key] = result
+        return result
+
+    @staticmethod
+    def invalidate(prefix: str = ""):
+        """Drop cached GETs whose endpoint starts with prefix (all if empty)."""
+        with _GET_CACHE_LOCK:
+            for key in [k for k in _GET_CACHE.keys() if k[0].startswith(prefix)]:
+                _GET_CACHE.pop(key, None)
 
     def fhir_post(self, endpoint: str, access_token: str, body: dict):
         return self.epic.fhir_post(endpoint, access_token, body)
@@ -4,6 +4,10 @@
 # Azure, email, CRM, customer lookup, authentication, etc.)
 # into a unified callable interface.
 
+import asyncio
+import inspect
+import sys
+
 
 class MCPRouter:
     """
@@ -14,6 +18,10 @@ class MCPRouter:
         router.register("epic.oauth", epic.get_token)
 
         router.call("customer.lookup", phone="5551234567")
+
+    A handler may expose a `_batch` attribute: a callable taking a list of
+    kwargs dicts and returning a list of results in the same order.
+    call_batch() then forwards all requests for that name in one shot.
     """
 
     def __init__(self):
@@ -28,17 +36,77 @@ class MCPRouter:
         if not callable(func):
             raise ValueError(f"MCPRouter: {name} must be callable")
 
-        self.methods[name] = func
+        self.methods[sys.intern(name)] = func
 
     # -------------------------------------------------------
     # Call method
     # -------------------------------------------------------
     def call(self, name: str, **kwargs):
         """Call a registered MCP method."""
-        if name not in self.methods:
+        func = self.methods.get(name)
+        if func is None:
+            raise ValueError(f"MCPRouter: '{name}' not found")
+
+        return func(**kwargs)
+
+    # -------------------------------------------------------
+    # Async dispatch
+    # -------------------------------------------------------
+    async def acall(self, name: str, **kwargs):
+        """
+        Call a registered method, awaiting it if it is async.
+        Sync handlers run in a worker thread so they don't block the event loop.
+        """
+        func = self.methods.get(name)
+        if func is None:
             raise ValueError(f"MCPRouter: '{name}' not found")
 
-        return self.methods[name](**kwargs)
+        if inspect.iscoroutinefunction(func):
+            return await func(**kwargs)
+
+        result = await asyncio.to_thread(func, **kwargs)
+        return await result if inspect.isawaitable(result) else result
+
+    async def acall_many(self, reqs):
+        """
+        Run independent calls concurrently: [(name, kwargs), ...] -> results in order.
+        Sync handlers run in worker threads, so blocking I/O overlaps too.
+        """
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(self.acall(name, **kwargs)) for name, kwargs in reqs]
+        return [t.result() for t in tasks]
+
+    # -------------------------------------------------------
+    # Call many methods, batching requests that share a name
+    # -------------------------------------------------------
+    async def call_batch(self, reqs):
+        """
+        reqs: [(name, kwargs), ...] -> results in the same order.
+        Requests are grouped by name; handlers with a `_batch` attribute get
+        the whole group at once, others are called one by one.
+        """
+        groups = {}
+        for i, (name, kwargs) in enumerate(reqs):
+            groups.setdefault(name, []).append((i, kwargs))
+
+        results = [None] * len(reqs)
+        for name, items in groups.items():
+            func = self.methods.get(name)
+            if func is None:
+                raise ValueError(f"MCPRouter: '{name}' not found")
+
+            batch = getattr(func, "_batch", None)
+            if batch is not None:
+                out = batch([kwargs for _, kwargs in items])
+                if inspect.isawaitable(out):
+                    out = await out
+            else:
+                out = [await self.acall(name, **kwargs) for _, kwargs in items]
+
+            for (i, _), r in zip(items, out):
+                results[i] = r
+
+        return results
 
     # -------------------------------------------------------
     # List registered methods
@@ -1,6 +1,8 @@
 import os
 import datetime
+import functools
 import logging
+import orjson
 
 # ------------------------------------------------------------
 # Logging Setup
@@ -40,7 +42,12 @@ def iso_to_human(iso_dt: str):
     """
     if not iso_dt:
         return "Unknown"
+    return _iso_to_human(iso_dt)
 
+
+@functools.lru_cache(maxsize=4096)
+def _iso_to_human(iso_dt: str):
+    # slot lists repeat the same timestamps; parse each distinct string once
     try:
         dt = datetime.datetime.fromisoformat(iso_dt.replace("Z", "+00:00"))
         return dt.strftime("%b %d, %Y %H:%M")
@@ -80,8 +87,15 @@ def mask(value: str, show_last=4):
     return "*" * max(0, len(value) - show_last) + value[-show_last:]
 
 
-def debug_dump(obj, label="DEBUG"):
+def debug_dump(obj, label="DEBUG", tag=None):
     """
-    Pretty-print dicts or objects for debugging.
+    Log dicts or objects for debugging as compact JSON.
+    Serialization is skipped entirely when INFO is disabled.
     """
-    logger.info(f"[{label}] {obj}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    try:
+        text = orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    except TypeError:
+        text = str(obj)
+    logger.info("[%s] %s", tag or label, text)
@@ -0,0 +1,50 @@
+import os
+import time
+from unittest import mock
+
+os.environ.setdefault("EPIC_SESSION_DB", ":memory:")
+
+from epic_oauth import SESSION_EXPIRED_GRACE, _SessionStore
+
+
+def _at(t):
+    return mock.patch("epic_oauth.time.time", return_value=t)
+
+
+def test_refreshable_session_survives_access_token_expiry():
+    store = _SessionStore(path=":memory:", ttl=3600)
+    t0 = 1_000_000.0
+    with _at(t0):
+        store["s1"] = {"token": {"access_token": "a", "refresh_token": "r", "expires_at": t0 + 3600}}
+    with _at(t0 + 3590):
+        assert "s1" in store
+    with _at(t0 + 3601):
+        # access token is expired, but the session must still be there to refresh it
+        assert store.get("s1")["token"]["refresh_token"] == "r"
+
+
+def test_idle_session_expires():
+    store = _SessionStore(path=":memory:", ttl=3600)
+    t0 = 1_000_000.0
+    with _at(t0):
+        store["s1"] = {"token": {"access_token": "a", "refresh_token": "r", "expires_at": t0 + 3600}}
+    with _at(t0 + 3601):
+        assert store.get("s1") is None
+
+
+def test_non_refreshable_session_expires_after_grace():
+    store = _SessionStore(path=":memory:", ttl=3600)
+    t0 = 1_000_000.0
+    with _at(t0):
+        store["s1"] = {"token": {"access_token": "a", "expires_at": t0 + 60}}
+    with _at(t0 + 60 + SESSION_EXPIRED_GRACE - 1):
+        assert "s1" in store
+    with _at(t0 + 60 + SESSION_EXPIRED_GRACE + 1):
+        assert "s1" not in store
+
+
+if __name__ == "__main__":
+    test_refreshable_session_survives_access_token_expiry()
+    test_idle_session_expires()
+    test_non_refreshable_session_expires_after_grace()
+    print("✅ Session store tests passed!")